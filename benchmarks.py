@@ -0,0 +1,242 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+STAGES = ('generation', 'pipeline', 'training', 'evaluation')
+DATASET_SIZES = (1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+# (diseases, genetic variants) in the knowledge graph
+GRAPH_SIZES = {'small': (3, 3), 'medium': (50, 100), 'large': (500, 2_000)}
+# Largest dataset each stage is run at; bigger sweep sizes are skipped for that stage
+STAGE_MAX_ROWS = {'generation': 10_000_000, 'pipeline': 1_000_000, 'training': 100_000, 'evaluation': 10_000_000}
+QUICK_SIZES = (1_000, 10_000)
+REGRESSION_THRESHOLD = 0.10
+BATCH_SIZE = 256
+MEASUREMENT_TIMEOUT = 3600
+
+def _version(package):
+    from importlib import metadata
+
+    try:
+        return metadata.version(package)
+    except metadata.PackageNotFoundError:
+        return None
+
+def machine_metadata():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'hostname': platform.node(),
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'python': platform.python_version(),
+        'git_commit': commit,
+        'packages': {name: _version(name) for name in ('numpy', 'pandas', 'scipy', 'pyarrow', 'tensorflow', 'tensorflow-cpu')},
+    }
+
+def _graph(graph):
+    from data_generation import get_compiled_knowledge_graph
+
+    num_diseases, num_variants = GRAPH_SIZES[graph]
+    diseases = tuple(f'Disease_{i}' for i in range(num_diseases))
+    variants = tuple(f'Variant_{i}' for i in range(num_variants))
+    return get_compiled_knowledge_graph(diseases, variants, seed=0), list(variants)
+
+def _bench_generation(rows, graph, repeats):
+    from data_generation import generate_synthetic_data
+
+    G, _ = _graph(graph)
+    latencies = []
+    for repeat in range(repeats):
+        started = time.perf_counter()
+        generate_synthetic_data(rows, G, engine='vectorized', seed=repeat)
+        latencies.append(time.perf_counter() - started)
+    return rows / np.median(latencies), latencies
+
+def _bench_pipeline(rows, graph, repeats):
+    from data_generation import generate_synthetic_data
+    from utils import prepare_data_for_training
+
+    G, variants = _graph(graph)
+    data = generate_synthetic_data(rows, G, engine='vectorized', seed=0)
+    # One latency per batch; throughput from the whole pass
+    latencies, totals = [], []
+    for repeat in range(repeats):
+        dataset = prepare_data_for_training(data, batch_size=BATCH_SIZE, genetic_variants=variants, seed=repeat)
+        iterator = iter(dataset)
+        started = total_started = time.perf_counter()
+        for _ in iterator:
+            now = time.perf_counter()
+            latencies.append(now - started)
+            started = now
+        totals.append(time.perf_counter() - total_started)
+    return rows / np.median(totals), latencies
+
+def _bench_training(rows, graph, repeats):
+    from data_generation import generate_synthetic_data
+    from models import HierarchicalVAEGAN
+    from telemetry import TrainingTelemetry, load_telemetry
+    from utils import build_feature_spec, prepare_data_for_training, train_hierarchical_vaegan
+
+    G, variants = _graph(graph)
+    data = generate_synthetic_data(rows, G, engine='vectorized', seed=0)
+    dataset = prepare_data_for_training(data, batch_size=BATCH_SIZE, genetic_variants=variants, cache='memory', seed=0)
+    input_dims = {name: dataset.element_spec[name].shape[-1] for name in ('genetic', 'clinical', 'environmental')}
+    model = HierarchicalVAEGAN(input_dims, 10, feature_spec=build_feature_spec(variants))
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'telemetry.csv')
+        # The first epoch traces the graph and fills the cache; the others are steady state
+        train_hierarchical_vaegan(model, dataset, epochs=repeats + 1, compiled=True, telemetry=TrainingTelemetry(path))
+        telemetry = load_telemetry(path)
+    steady = telemetry[telemetry['epoch'] > 0]
+    return rows / steady.groupby('epoch')['step_seconds'].sum().median(), list(steady['step_seconds'])
+
+def _bench_evaluation(rows, graph, repeats):
+    from data_generation import generate_synthetic_data
+    from evaluationmetrics import calculate_distributional_consistency, perform_statistical_tests
+
+    G, _ = _graph(graph)
+    real_data = generate_synthetic_data(rows, G, engine='vectorized', seed=0)
+    synthetic_data = generate_synthetic_data(rows, G, engine='vectorized', seed=1)
+    latencies = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        calculate_distributional_consistency(real_data, synthetic_data)
+        perform_statistical_tests(real_data, synthetic_data, method='sketch')
+        latencies.append(time.perf_counter() - started)
+    return rows / np.median(latencies), latencies
+
+BENCHMARKS = {
+    'generation': _bench_generation,
+    'pipeline': _bench_pipeline,
+    'training': _bench_training,
+    'evaluation': _bench_evaluation,
+}
+
+def _repeats(rows, repeats):
+    # Large runs are long enough that one repeat is a stable measurement
+    return repeats if rows < 1_000_000 else 1
+
+def run_measurement(stage, rows, graph, repeats=3):
+    """
+    Run one benchmark in this process and return its result. Peak RSS is the process's
+    high-water mark, so each measurement should get a fresh process (see measure).
+    """
+    from telemetry import peak_rss_mb
+
+    rows_per_second, latencies = BENCHMARKS[stage](rows, graph, _repeats(rows, repeats))
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+    return {
+        'stage': stage,
+        'rows': rows,
+        'graph': graph,
+        'rows_per_second': float(rows_per_second),
+        'latency_p50': float(p50),
+        'latency_p90': float(p90),
+        'latency_p99': float(p99),
+        'latency_samples': len(latencies),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+def measure(stage, rows, graph, repeats=3, timeout=MEASUREMENT_TIMEOUT):
+    """
+    Run one benchmark in a fresh CPU-only subprocess so its peak RSS is its own.
+    """
+    spec = json.dumps({'stage': stage, 'rows': rows, 'graph': graph, 'repeats': repeats})
+    env = {**os.environ, 'CUDA_VISIBLE_DEVICES': '-1', 'TF_CPP_MIN_LOG_LEVEL': '2'}
+    command = [sys.executable, os.path.abspath(__file__), '--worker', spec]
+    base = {'stage': stage, 'rows': rows, 'graph': graph}
+    try:
+        completed = subprocess.run(command, capture_output=True, text=True, env=env, timeout=timeout,
+                                   cwd=os.path.dirname(os.path.abspath(__file__)))
+    except subprocess.TimeoutExpired:
+        return {**base, 'error': f'timed out after {timeout}s'}
+    if completed.returncode != 0:
+        return {**base, 'error': completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else f'exit code {completed.returncode}'}
+    # The result is the last line; libraries may print before it
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def run_suite(stages=STAGES, sizes=DATASET_SIZES, graphs=tuple(GRAPH_SIZES), repeats=3, timeout=MEASUREMENT_TIMEOUT,
+              verbose=True):
+    """
+    Sweep every stage over dataset sizes (up to STAGE_MAX_ROWS) and graph sizes and return
+    {'metadata': machine_metadata(), 'results': [...]} ready to be saved as JSON.
+    """
+    results = []
+    for stage in stages:
+        for graph in graphs:
+            for rows in sizes:
+                if rows > STAGE_MAX_ROWS[stage]:
+                    continue
+                result = measure(stage, rows, graph, repeats=repeats, timeout=timeout)
+                if verbose:
+                    outcome = result.get('error') or f"{result['rows_per_second']:,.0f} rows/s, p50 {result['latency_p50']:.4f}s, peak {result['peak_rss_mb']:.0f} MiB"
+                    print(f"{stage:<10} {graph:<6} {rows:>10,}  {outcome}", flush=True)
+                results.append(result)
+    return {'metadata': machine_metadata(), 'results': results}
+
+def compare_to_baseline(report, baseline, threshold=REGRESSION_THRESHOLD):
+    """
+    Match results by (stage, graph, rows) and flag a regression where throughput fell, or
+    peak RSS grew, by more than threshold relative to the baseline.
+    """
+    key = ['stage', 'graph', 'rows']
+    current = pd.DataFrame([r for r in report['results'] if 'error' not in r])
+    previous = pd.DataFrame([r for r in baseline['results'] if 'error' not in r])
+    if current.empty or previous.empty:
+        return pd.DataFrame(columns=key + ['throughput_change', 'memory_change', 'regression'])
+    merged = current.merge(previous, on=key, suffixes=('', '_baseline'))
+    merged['throughput_change'] = merged['rows_per_second'] / merged['rows_per_second_baseline'] - 1
+    merged['memory_change'] = merged['peak_rss_mb'] / merged['peak_rss_mb_baseline'] - 1
+    merged['regression'] = (merged['throughput_change'] < -threshold) | (merged['memory_change'] > threshold)
+    return merged[key + ['rows_per_second', 'rows_per_second_baseline', 'throughput_change',
+                         'peak_rss_mb', 'peak_rss_mb_baseline', 'memory_change', 'regression']]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark generation, input pipeline, training and evaluation")
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=list(STAGES))
+    parser.add_argument('--sizes', nargs='+', type=int, help="dataset sizes in rows (default 1e3 to 1e7)")
+    parser.add_argument('--graphs', nargs='+', choices=list(GRAPH_SIZES), default=list(GRAPH_SIZES))
+    parser.add_argument('--quick', action='store_true', help="small sizes and graph only")
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--timeout', type=int, default=MEASUREMENT_TIMEOUT, help="seconds per measurement")
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--baseline', help="earlier results JSON to compare against")
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD)
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        spec = json.loads(args.worker)
+        print(json.dumps(run_measurement(spec['stage'], spec['rows'], spec['graph'], spec['repeats'])))
+        return 0
+
+    sizes = args.sizes or (QUICK_SIZES if args.quick else DATASET_SIZES)
+    graphs = ['small'] if args.quick else args.graphs
+    report = run_suite(args.stages, sizes, graphs, repeats=args.repeats, timeout=args.timeout)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            comparison = compare_to_baseline(report, json.load(f), args.threshold)
+        print(comparison.to_string(index=False))
+        if comparison['regression'].any():
+            print(f"Regressions beyond {args.threshold:.0%} against {args.baseline}")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,258 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+STAGES = ('generate', 'train', 'sample', 'evaluate', 'export')
+
+EXAMPLE_CONFIG = """\
+# Stages run in generate -> train -> sample -> evaluate -> export order; leave a section
+# out to skip its stage.
+seed = 42
+
+[generate]
+num_samples = 100000
+diseases = ["Cystic Fibrosis", "Hemophilia", "Huntington's Disease"]
+genetic_variants = ["Mutation X", "Mutation Y", "Mutation Z"]
+
+# Optional: sample only a cohort, e.g. Huntington's patients aged 60 and over
+# [generate.constraints]
+# Disease = "Huntington's Disease"
+# Age = {min = 60}
+
+[train]
+epochs = 5
+latent_dim = 10
+learning_rate = 0.001
+batch_size = 32
+model_store = "model_store"
+telemetry = "runs/telemetry.csv"
+
+[sample]
+num_samples = 100000
+
+[evaluate]
+output_dir = "evaluation"
+method = "sketch"
+multivariate = true
+report_format = "html"
+
+[export]
+path = "output/synthetic.parquet"
+source = "sampled"
+"""
+
+def load_config(path):
+    """
+    Read a pipeline config from a .json or .toml file.
+    """
+    if str(path).endswith('.toml'):
+        try:
+            import tomllib
+        except ImportError:  # Python < 3.11
+            import tomli as tomllib
+        with open(path, 'rb') as f:
+            return tomllib.load(f)
+    with open(path) as f:
+        return json.load(f)
+
+def _log(message):
+    print(message, file=sys.stderr, flush=True)
+
+class PipelineContext:
+    """
+    State handed from stage to stage. The generated frame is only built when a later stage
+    needs it, so generate -> export alone streams straight to disk whenever that writes
+    the same rows (see streamable).
+    """
+    def __init__(self, config):
+        self.config = config
+        self.seed = config.get('seed')
+        self.graph = None
+        self.model = None
+        self.sampled = None
+        self._generated = None
+
+    @property
+    def generated(self):
+        if self._generated is None:
+            options = self.config['generate']
+            if options.get('constraints'):
+                from data_generation import generate_conditional_data
+
+                self._generated = generate_conditional_data(options.get('num_samples', 1000), self.graph,
+                                                            constraints(options['constraints']), seed=self.seed)
+            else:
+                from data_generation import generate_synthetic_data
+
+                self._generated = generate_synthetic_data(options.get('num_samples', 1000), self.graph,
+                                                          engine=options.get('engine', 'parallel'), seed=self.seed,
+                                                          workers=options.get('workers'),
+                                                          shard_size=options.get('shard_size', 100_000))
+        return self._generated
+
+    @property
+    def streamable(self):
+        # The parallel engine draws shard i from the i-th child seed, exactly like chunk i of
+        # write_synthetic_data, so streaming its output writes the rows it would have built
+        options = self.config['generate']
+        return (self._generated is None and not options.get('constraints')
+                and options.get('engine', 'parallel') == 'parallel')
+
+def constraints(section):
+    """
+    Conditional-generation constraints from a config section. Config files have no tuples,
+    so ranges are written as {min = ..., max = ...} tables (min inclusive, max exclusive);
+    lists stay sets of allowed values.
+    """
+    return {column: (condition.get('min'), condition.get('max')) if isinstance(condition, dict) else condition
+            for column, condition in section.items()}
+
+def run_generate(context):
+    from data_generation import get_compiled_knowledge_graph
+
+    options = context.config['generate']
+    context.graph = get_compiled_knowledge_graph(options['diseases'], options['genetic_variants'], seed=context.seed)
+
+def run_train(context):
+    from utils import build_feature_spec, prepare_data_for_training, train_hierarchical_vaegan
+
+    options = context.config.get('train', {})
+    data = context.generated
+    genetic_variants = list(context.config['generate']['genetic_variants'])
+    dataset = prepare_data_for_training(data, batch_size=options.get('batch_size', 32), cache='memory',
+                                        genetic_variants=genetic_variants, seed=context.seed)
+    input_dims = {name: dataset.element_spec[name].shape[-1] for name in ('genetic', 'clinical', 'environmental')}
+    epochs = options.get('epochs', 5)
+    latent_dim = options.get('latent_dim', 10)
+    learning_rate = options.get('learning_rate', 0.001)
+    feature_spec = build_feature_spec(genetic_variants)
+
+    def train(model, dataset, telemetry=options.get('telemetry')):
+        train_hierarchical_vaegan(model, dataset, epochs, compiled=options.get('compiled', True),
+                                  steps_per_execution=options.get('steps_per_execution', 1), telemetry=telemetry,
+                                  learning_rate=learning_rate)
+
+    if options.get('model_store'):
+        from model_store import ModelStore, model_config
+
+        config = model_config(context.config['generate']['diseases'], genetic_variants, input_dims, latent_dim,
+                              feature_spec, epochs=epochs, learning_rate=learning_rate, num_samples=len(data))
+        store = ModelStore(options['model_store'])
+        context.model, status = store.get_or_train(config, dataset, train)
+        _log(f"  model {status} ({store.path(config)})")
+    else:
+        from models import HierarchicalVAEGAN
+
+        context.model = HierarchicalVAEGAN(input_dims, latent_dim, feature_spec=feature_spec)
+        train(context.model, dataset)
+
+def run_sample(context):
+    if context.model is None:
+        raise ValueError("The sample stage needs a model; add a [train] section")
+    options = context.config.get('sample', {})
+    num_samples = options.get('num_samples', context.config['generate'].get('num_samples', 1000))
+    context.sampled = context.model.sample(num_samples, batch_size=options.get('batch_size', 65536), seed=context.seed)
+
+def run_evaluate(context):
+    import evaluationmetrics as em
+
+    options = context.config.get('evaluate', {})
+    if context.sampled is None:
+        raise ValueError("The evaluate stage compares generated and sampled data; add a [sample] section")
+    # Identifiers are row numbers, not data; comparing their distributions means nothing
+    real_data = context.generated.drop(columns=list(em.IDENTIFIER_COLUMNS), errors='ignore')
+    synthetic_data = context.sampled.drop(columns=list(em.IDENTIFIER_COLUMNS), errors='ignore')
+    output_dir = options.get('output_dir', 'evaluation')
+    os.makedirs(output_dir, exist_ok=True)
+
+    em.calculate_distributional_consistency(real_data, synthetic_data).to_csv(os.path.join(output_dir, 'distributional_consistency.csv'))
+    em.perform_statistical_tests(real_data, synthetic_data, method=options.get('method', 'exact'),
+                                 workers=options.get('workers')).to_csv(os.path.join(output_dir, 'statistical_tests.csv'), index=False)
+    if options.get('multivariate'):
+        em.calculate_association_deltas(real_data, synthetic_data).to_csv(os.path.join(output_dir, 'association_deltas.csv'))
+        em.calculate_privacy_metrics(real_data, synthetic_data).to_csv(os.path.join(output_dir, 'privacy.csv'))
+        with open(os.path.join(output_dir, 'mmd.json'), 'w') as f:
+            json.dump({'mmd': em.calculate_mmd(real_data, synthetic_data, seed=context.seed or 0)}, f)
+    if options.get('report_format'):
+        em.render_distribution_report(real_data, synthetic_data, output_dir=os.path.join(output_dir, 'report'),
+                                      fmt=options['report_format'], workers=options.get('workers'))
+    _log(f"  results in {output_dir}")
+
+def run_export(context):
+    from export import export_data, infer_export_format
+
+    options = context.config['export']
+    path = options['path']
+    file_format, compression = infer_export_format(path)
+    compression = options.get('compression', compression)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    source = options.get('source', 'sampled' if context.sampled is not None else 'generated')
+    if source == 'sampled':
+        if context.sampled is None:
+            raise ValueError("Nothing sampled to export; add a [sample] section or set source = \"generated\"")
+        rows = export_data(context.sampled, path, file_format, compression=compression)
+    elif context.streamable:
+        from data_generation import write_synthetic_data
+
+        generate = context.config['generate']
+        rows = write_synthetic_data(path, generate.get('num_samples', 1000), context.graph,
+                                    chunk_size=generate.get('shard_size', 100_000), seed=context.seed,
+                                    file_format=file_format, compression=compression)
+    else:
+        rows = export_data(context.generated, path, file_format, compression=compression)
+    _log(f"  wrote {rows} rows to {path}")
+
+STAGE_FUNCTIONS = {
+    'generate': run_generate,
+    'train': run_train,
+    'sample': run_sample,
+    'evaluate': run_evaluate,
+    'export': run_export,
+}
+
+def run_pipeline(config, stages=None):
+    """
+    Run the configured stages in pipeline order. By default a stage runs when its section
+    is in config; generate always runs since every other stage starts from its graph.
+    Heavy libraries (TensorFlow, scipy, plotting) are imported by the stages that use them.
+    """
+    if 'generate' not in config:
+        raise ValueError("The config needs a [generate] section")
+    selected = set(stages) if stages else {stage for stage in STAGES if stage in config}
+    selected.add('generate')
+    context = PipelineContext(config)
+    for stage in STAGES:
+        if stage not in selected:
+            continue
+        started = time.perf_counter()
+        _log(f"[{stage}]")
+        STAGE_FUNCTIONS[stage](context)
+        _log(f"  done in {time.perf_counter() - started:.2f}s")
+    return context
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless synthetic data pipeline: generate, train, sample, evaluate, export")
+    parser.add_argument('config', nargs='?', help="pipeline config (.toml or .json)")
+    parser.add_argument('--stages', nargs='+', choices=STAGES, help="run only these stages (default: every configured section)")
+    parser.add_argument('--seed', type=int, help="override the config seed")
+    parser.add_argument('--example-config', action='store_true', help="print an example TOML config and exit")
+    args = parser.parse_args(argv)
+
+    if args.example_config:
+        print(EXAMPLE_CONFIG, end='')
+        return 0
+    if args.config is None:
+        parser.error("a config file is required")
+    config = load_config(args.config)
+    if args.seed is not None:
+        config['seed'] = args.seed
+    run_pipeline(config, args.stages)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,19 @@
-import networkx as nx
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 import pandas as pd
 import numpy as np
+from schema import categorical, to_compact, vocabularies
+
+def _edge_weights(num_diseases, num_variants, seed=None):
+    # Edge weights in (disease, variant) creation order; seed=None keeps using the global state
+    if seed is None:
+        return np.random.uniform(0.5, 1.0, size=(num_diseases, num_variants))
+    return np.random.default_rng(seed).uniform(0.5, 1.0, size=(num_diseases, num_variants))
+
+def create_healthcare_knowledge_graph(disease_select, genetic_variants, seed=None):
+    import networkx as nx
 
-def create_healthcare_knowledge_graph(disease_select, genetic_variants):
     G = nx.DiGraph()
 
     # Add diseases
@@ -14,65 +25,543 @@ def create_healthcare_knowledge_graph(disease_select, genetic_variants):
         G.add_node(variant, type='genetic_variant')
 
     # Example connections
-    for disease in disease_select:
-        for variant in genetic_variants:
-            G.add_edge(variant, disease, weight=np.random.uniform(0.5, 1.0))
+    weights = _edge_weights(len(disease_select), len(genetic_variants), seed)
+    for i, disease in enumerate(disease_select):
+        for j, variant in enumerate(genetic_variants):
+            G.add_edge(variant, disease, weight=float(weights[i, j]))
 
     return G
 
-def apply_semantic_rules(patient_data):
-    facts = {}
-    genetic_variant = patient_data.get('Genetic_Variant')
+class CompiledKnowledgeGraph:
+    """
+    Indexed, read-only form of a healthcare knowledge graph: node-id arrays, a dense
+    variant x disease weight matrix with its CSR view, and per-variant cumulative disease
+    distributions ready for vectorized sampling.
+    """
+    def __init__(self, diseases, genetic_variants, weights):
+        self.diseases = np.asarray(diseases, dtype=object)
+        self.genetic_variants = np.asarray(genetic_variants, dtype=object)
+        self.disease_index = {disease: j for j, disease in enumerate(self.diseases)}
+        self.variant_index = {variant: i for i, variant in enumerate(self.genetic_variants)}
 
-    if genetic_variant == 'Mutation X':
-        facts['Disease_Risk'] = 'High Risk'
-    elif genetic_variant == 'Mutation Y':
-        facts['Disease_Risk'] = 'Medium Risk'
-    else:
-        facts['Disease_Risk'] = 'Low Risk'
+        self.weights = np.asarray(weights, dtype=np.float64).reshape(len(self.genetic_variants), len(self.diseases))
+        rows, cols = np.nonzero(self.weights)
+        self.indptr = np.concatenate([[0], np.cumsum(np.bincount(rows, minlength=len(self.genetic_variants)))])
+        self.indices = cols
+        self.data = self.weights[rows, cols]
 
-    return facts
+        # Normalize each variant's outgoing weights, uniform where a variant has no edges
+        totals = self.weights.sum(axis=1, keepdims=True)
+        uniform = np.full_like(self.weights, 1 / max(len(self.diseases), 1))
+        self.probabilities = np.where(totals > 0, self.weights / np.where(totals > 0, totals, 1), uniform)
+        self.cumulative_probs = np.cumsum(self.probabilities, axis=1)
+        # Offsetting row r by r turns the whole matrix into one sorted array, so draws for
+        # every variant are resolved by a single searchsorted
+        self._search_table = (self.cumulative_probs + np.arange(len(self.genetic_variants))[:, None]).ravel()
 
-def generate_synthetic_data(num_samples, G):
-    data = []
+    def sample_diseases(self, rng, variant_idx):
+        num_diseases = len(self.diseases)
+        positions = np.searchsorted(self._search_table, variant_idx + rng.random(len(variant_idx)), side='right')
+        return np.clip(positions - variant_idx * num_diseases, 0, num_diseases - 1)
+
+def compile_knowledge_graph(G):
+    if isinstance(G, CompiledKnowledgeGraph):
+        return G
     diseases = [n for n, attr in G.nodes(data=True) if attr['type'] == 'disease']
     genetic_variants = [n for n, attr in G.nodes(data=True) if attr['type'] == 'genetic_variant']
+    disease_index = {disease: j for j, disease in enumerate(diseases)}
+    variant_index = {variant: i for i, variant in enumerate(genetic_variants)}
+
+    weights = np.zeros((len(genetic_variants), len(diseases)))
+    for variant, disease, weight in G.edges(data='weight', default=0.0):
+        if variant in variant_index and disease in disease_index:
+            weights[variant_index[variant], disease_index[disease]] = weight
+    return CompiledKnowledgeGraph(diseases, genetic_variants, weights)
+
+@lru_cache(maxsize=32)
+def _cached_knowledge_graph(disease_select, genetic_variants, seed):
+    weights = _edge_weights(len(disease_select), len(genetic_variants), seed)
+    return CompiledKnowledgeGraph(disease_select, genetic_variants, weights.T)
+
+def get_compiled_knowledge_graph(disease_select, genetic_variants, seed=None):
+    """
+    Compiled equivalent of create_healthcare_knowledge_graph, memoized (LRU) by the
+    disease/variant selection and seed. Repeated requests skip graph construction and
+    normalization; with seed=None the first graph built for a selection is reused.
+    """
+    return _cached_knowledge_graph(tuple(disease_select), tuple(genetic_variants), seed)
+
+# Declarative semantic rules. Each rule sets the facts in 'then' for every patient matching
+# all of its 'when' conditions; for each fact the matching rule with the lowest priority
+# wins, and patients matched by no rule get DEFAULT_FACTS. A condition is either a single
+# value, a list/set of allowed values, or for Age a (low, high) band with low inclusive,
+# high exclusive and None meaning unbounded.
+SEMANTIC_RULES = [
+    {'priority': 10, 'when': {'Genetic_Variant': 'Mutation X'}, 'then': {'Disease_Risk': 'High Risk'}},
+    {'priority': 20, 'when': {'Genetic_Variant': 'Mutation Y'}, 'then': {'Disease_Risk': 'Medium Risk'}},
+]
+DEFAULT_FACTS = {'Disease_Risk': 'Low Risk'}
+RANGE_RULE_COLUMNS = ('Age',)
+
+class SemanticRuleTable:
+    """
+    Compiled form of a semantic rule list. Categorical conditions become boolean lookup
+    arrays over factorized column codes and range conditions become comparisons, so a
+    whole column set is evaluated with a handful of array operations per rule.
+    """
+    def __init__(self, rules=None, defaults=None):
+        rules = SEMANTIC_RULES if rules is None else rules
+        self.defaults = dict(DEFAULT_FACTS if defaults is None else defaults)
+        self.rules = sorted(rules, key=lambda rule: rule.get('priority', 0))
+
+        self.fact_values = {}
+        for fact, default in self.defaults.items():
+            values = [default] + [rule['then'][fact] for rule in self.rules if fact in rule['then']]
+            self.fact_values[fact] = np.array(list(dict.fromkeys(values)), dtype=object)
+        for rule in self.rules:
+            unknown = set(rule['then']) - set(self.defaults)
+            if unknown:
+                raise ValueError(f"Rule sets facts without a default: {sorted(unknown)}")
+
+        self._conditions = []
+        for rule in self.rules:
+            conditions = []
+            for column, condition in rule.get('when', {}).items():
+                if column in RANGE_RULE_COLUMNS:
+                    low, high = condition
+                    conditions.append((column, 'range', (low, high)))
+                else:
+                    allowed = condition if isinstance(condition, (list, tuple, set, frozenset)) else [condition]
+                    conditions.append((column, 'isin', frozenset(allowed)))
+            self._conditions.append(conditions)
+
+    @property
+    def columns(self):
+        return sorted({column for conditions in self._conditions for column, _, _ in conditions})
+
+    def breakpoints(self, column):
+        # Bounds used by range conditions on column; between two of them every rule treats
+        # all values alike
+        bounds = set()
+        for conditions in self._conditions:
+            for condition_column, kind, condition in conditions:
+                if condition_column == column and kind == 'range':
+                    bounds.update(bound for bound in condition if bound is not None)
+        return sorted(bounds)
+
+    def _rule_mask(self, conditions, columns, factorized, num_rows):
+        mask = np.ones(num_rows, dtype=bool)
+        for column, kind, condition in conditions:
+            if column not in columns:
+                return np.zeros(num_rows, dtype=bool)
+            if kind == 'range':
+                values = np.asarray(columns[column])
+                low, high = condition
+                if low is not None:
+                    mask &= values >= low
+                if high is not None:
+                    mask &= values < high
+            else:
+                codes, uniques = factorized[column]
+                lookup = np.fromiter((value in condition for value in uniques), dtype=bool, count=len(uniques))
+                # Code -1 marks missing values, which never match; it indexes the False pad
+                mask &= np.append(lookup, False)[codes]
+        return mask
+
+    def apply_codes(self, columns):
+        """
+        Evaluate the table over a mapping (or DataFrame) of equally long columns.
+        Categorical columns may be given as pandas Categoricals to skip factorizing.
+        Returns a dict of int arrays, one per fact, of codes into fact_values[fact].
+        """
+        num_rows = len(next(iter(columns.values()))) if isinstance(columns, dict) else len(columns)
+        factorized = {}
+        for column in self.columns:
+            if column in RANGE_RULE_COLUMNS or column not in columns:
+                continue
+            values = columns[column]
+            if isinstance(values, pd.Categorical) or isinstance(getattr(values, 'dtype', None), pd.CategoricalDtype):
+                values = pd.Categorical(values)
+                factorized[column] = (values.codes, np.asarray(values.categories, dtype=object))
+            else:
+                codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+                factorized[column] = (codes, np.asarray(uniques, dtype=object))
+
+        facts = {}
+        for fact, values in self.fact_values.items():
+            value_codes = {value: code for code, value in enumerate(values)}
+            result = np.zeros(num_rows, dtype=np.intp)
+            # Walk rules from lowest to highest precedence so that earlier rules overwrite
+            for rule, conditions in zip(reversed(self.rules), reversed(self._conditions)):
+                if fact in rule['then']:
+                    result[self._rule_mask(conditions, columns, factorized, num_rows)] = value_codes[rule['then'][fact]]
+            facts[fact] = result
+        return facts
+
+    def apply(self, columns):
+        # As apply_codes, with each fact as an object array of values
+        return {fact: self.fact_values[fact][codes] for fact, codes in self.apply_codes(columns).items()}
+
+    def apply_one(self, patient_data):
+        facts = {}
+        for fact, default in self.defaults.items():
+            facts[fact] = default
+            for rule in self.rules:
+                if fact in rule['then'] and _rule_matches(rule, patient_data):
+                    facts[fact] = rule['then'][fact]
+                    break
+        return facts
+
+def _rule_matches(rule, patient_data):
+    for column, condition in rule.get('when', {}).items():
+        if column not in patient_data:
+            return False
+        value = patient_data[column]
+        if column in RANGE_RULE_COLUMNS:
+            low, high = condition
+            if (low is not None and value < low) or (high is not None and value >= high):
+                return False
+        elif isinstance(condition, (list, tuple, set, frozenset)):
+            if value not in condition:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+@lru_cache(maxsize=1)
+def _default_rule_table():
+    return SemanticRuleTable()
+
+def compile_semantic_rules(rules=None, defaults=None):
+    if isinstance(rules, SemanticRuleTable):
+        return rules
+    if rules is None and defaults is None:
+        return _default_rule_table()
+    return SemanticRuleTable(rules, defaults)
+
+def apply_semantic_rules(patient_data, rules=None):
+    return compile_semantic_rules(rules).apply_one(patient_data)
+
+def generate_synthetic_data(num_samples, G, engine='loop', seed=None, workers=None, shard_size=100_000, rules=None):
+    if engine == 'vectorized':
+        return generate_synthetic_data_vectorized(num_samples, G, seed=seed, rules=rules)
+    if engine == 'parallel':
+        return generate_synthetic_data_parallel(num_samples, G, seed=seed, workers=workers, shard_size=shard_size, rules=rules)
+    if engine != 'loop':
+        raise ValueError(f"Unknown generation engine: {engine!r}")
+    if isinstance(seed, np.random.Generator):
+        raise ValueError("engine='loop' draws from a legacy RandomState; pass an integer seed")
+
+    # Without a seed the loop keeps drawing from the global numpy state, as it always has
+    random = np.random if seed is None else np.random.RandomState(seed)
+    data = []
+    graph, rule_table = _columnar_tables(G, rules)
+    diseases = list(graph.diseases)
+    genetic_variants = list(graph.genetic_variants)
 
     for i in range(num_samples):
         patient = {}
         patient['Patient_ID'] = i + 1
-        patient['Age'] = np.random.randint(0, 100)
-        patient['Gender'] = np.random.choice(['Male', 'Female'])
-        patient['Genetic_Variant'] = np.random.choice(genetic_variants)
+        patient['Age'] = random.randint(0, 100)
+        patient['Gender'] = random.choice(['Male', 'Female'])
+        patient['Genetic_Variant'] = random.choice(genetic_variants)
+
+        # Assign disease based on knowledge graph probabilities (normalized edge weights,
+        # uniform for a variant without edges)
+        disease_probs = graph.probabilities[graph.variant_index[patient['Genetic_Variant']]]
+        disease = random.choice(diseases, p=disease_probs)
 
         # Apply semantic rules
-        patient_facts = apply_semantic_rules({'Genetic_Variant': patient['Genetic_Variant']})
+        patient_facts = rule_table.apply_one({**patient, 'Disease': disease})
         patient.update(patient_facts)
-
-        # Assign disease based on knowledge graph probabilities
-        disease_probs = []
-        for disease in diseases:
-            edge_data = G.get_edge_data(patient['Genetic_Variant'], disease, default=None)
-            if edge_data:
-                disease_probs.append(edge_data['weight'])
-            else:
-                disease_probs.append(0.0)
-
-        # Normalize probabilities if sum is not zero
-        total_weight = sum(disease_probs)
-        if total_weight > 0:
-            disease_probs = [prob / total_weight for prob in disease_probs]
-        else:
-            disease_probs = [1 / len(diseases)] * len(diseases)
-
-        patient['Disease'] = np.random.choice(diseases, p=disease_probs)
+        patient['Disease'] = disease
 
         # Simulate other clinical data
-        patient['Risk_Score'] = np.random.uniform(0, 1)
-        patient['Lab_Result_1'] = np.random.normal(100, 15)
-        patient['Lab_Result_2'] = np.random.normal(50, 10)
+        patient['Risk_Score'] = random.uniform(0, 1)
+        patient['Lab_Result_1'] = random.normal(100, 15)
+        patient['Lab_Result_2'] = random.normal(50, 10)
 
         data.append(patient)
 
     synthetic_data = pd.DataFrame(data)
-    return synthetic_data
+    return to_compact(synthetic_data, vocabularies(graph, rule_table))
+
+
+# Distributions of the independently drawn columns: Age uniform on [low, high), Risk_Score
+# uniform, lab results normal (mean, standard deviation)
+AGE_RANGE = (0, 100)
+RISK_SCORE_RANGE = (0.0, 1.0)
+LAB_RESULT_DISTRIBUTIONS = {'Lab_Result_1': (100, 15), 'Lab_Result_2': (50, 10)}
+
+def _columnar_tables(G, rules=None):
+    return compile_knowledge_graph(G), compile_semantic_rules(rules)
+
+def _draw_patient_columns(rng, num_samples, tables, start_id):
+    # Columns are built directly in their compact schema dtypes (see schema.COLUMNS)
+    graph, rule_table = tables
+    vocabulary = vocabularies(graph, rule_table)
+
+    age = rng.integers(*AGE_RANGE, size=num_samples).astype(np.uint8)
+    gender = categorical(rng.integers(0, 2, size=num_samples), vocabulary['Gender'])
+    variant_idx = rng.integers(0, len(graph.genetic_variants), size=num_samples)
+    variant = categorical(variant_idx, vocabulary['Genetic_Variant'])
+    disease = categorical(graph.sample_diseases(rng, variant_idx), vocabulary['Disease'])
+    facts = rule_table.apply_codes({'Age': age, 'Gender': gender, 'Genetic_Variant': variant, 'Disease': disease})
+
+    return pd.DataFrame({
+        'Patient_ID': np.arange(start_id, start_id + num_samples, dtype=np.uint32),
+        'Age': age,
+        'Gender': gender,
+        'Genetic_Variant': variant,
+        'Disease_Risk': categorical(facts['Disease_Risk'], vocabulary['Disease_Risk']),
+        'Disease': disease,
+        'Risk_Score': rng.uniform(*RISK_SCORE_RANGE, size=num_samples).astype(np.float32),
+        'Lab_Result_1': rng.normal(*LAB_RESULT_DISTRIBUTIONS['Lab_Result_1'], size=num_samples).astype(np.float32),
+        'Lab_Result_2': rng.normal(*LAB_RESULT_DISTRIBUTIONS['Lab_Result_2'], size=num_samples).astype(np.float32),
+    })
+
+def generate_synthetic_data_vectorized(num_samples, G, seed=None, start_id=1, rules=None):
+    """
+    Columnar counterpart of generate_synthetic_data: every attribute is drawn as a whole
+    column from a numpy Generator, so a given seed always reproduces the same frame.
+    """
+    rng = seed if isinstance(seed, np.random.Generator) else np.random.default_rng(seed)
+    return _draw_patient_columns(rng, num_samples, _columnar_tables(G, rules), start_id)
+
+def chunk_rng(seed, chunk_index):
+    # Independent generator for one chunk, derived from the master seed by spawn key,
+    # so chunk i is reproducible without drawing chunks 0..i-1 first
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(chunk_index,)))
+
+def _chunk_bounds(num_samples, chunk_size):
+    for chunk_index, start in enumerate(range(0, num_samples, chunk_size)):
+        yield chunk_index, start, min(chunk_size, num_samples - start)
+
+def iter_synthetic_data(num_samples, G, chunk_size=100_000, seed=None, output='pandas', rules=None):
+    """
+    Yield the synthetic dataset as consecutive chunks of at most chunk_size rows with
+    continuous Patient_IDs. output='arrow' yields pyarrow RecordBatches instead of
+    DataFrames. Only one chunk is alive at a time, so memory does not grow with num_samples.
+    """
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be positive")
+    if output not in ('pandas', 'arrow'):
+        raise ValueError(f"Unknown chunk output type: {output!r}")
+    if output == 'arrow':
+        import pyarrow as pa
+
+    if seed is None:
+        seed = np.random.SeedSequence().entropy
+    tables = _columnar_tables(G, rules)
+
+    for chunk_index, start, rows in _chunk_bounds(num_samples, chunk_size):
+        chunk = _draw_patient_columns(chunk_rng(seed, chunk_index), rows, tables, start + 1)
+        if output == 'arrow':
+            chunk = pa.RecordBatch.from_pandas(chunk, preserve_index=False)
+        yield chunk
+
+_shard_tables = None
+
+def _init_shard_worker(tables):
+    global _shard_tables
+    _shard_tables = tables
+
+def _generate_shard(shard):
+    seed, shard_index, start, rows = shard
+    return _draw_patient_columns(chunk_rng(seed, shard_index), rows, _shard_tables, start + 1)
+
+def generate_synthetic_data_parallel(num_samples, G, seed=None, workers=None, shard_size=100_000, rules=None):
+    """
+    Split num_samples into shards of shard_size rows, generate them in a process pool and
+    concatenate them in shard order. Shard i always uses the i-th child seed of the master
+    seed, so the result for a given seed and shard_size does not depend on workers.
+    """
+    if shard_size <= 0:
+        raise ValueError("shard_size must be positive")
+    if seed is None:
+        seed = np.random.SeedSequence().entropy
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    tables = _columnar_tables(G, rules)
+    shards = [(seed, index, start, rows) for index, start, rows in _chunk_bounds(num_samples, shard_size)]
+    if not shards:
+        return _draw_patient_columns(np.random.default_rng(seed), 0, tables, 1)
+
+    workers = min(workers, len(shards))
+    if workers <= 1:
+        _init_shard_worker(tables)
+        frames = [_generate_shard(shard) for shard in shards]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_shard_worker, initargs=(tables,)) as executor:
+            frames = list(executor.map(_generate_shard, shards))
+    return pd.concat(frames, ignore_index=True)
+
+# Conditional generation. A constraint is a single value (equality), a list/set of allowed
+# values, or for numeric columns a (low, high) tuple with low inclusive, high exclusive and
+# None meaning unbounded - the same forms as semantic rule conditions.
+CATEGORICAL_CONSTRAINT_COLUMNS = ('Gender', 'Genetic_Variant', 'Disease', 'Disease_Risk')
+CONTINUOUS_CONSTRAINT_COLUMNS = ('Risk_Score', 'Lab_Result_1', 'Lab_Result_2')
+
+def _allowed_mask(vocabulary, condition):
+    allowed = condition if isinstance(condition, (list, tuple, set, frozenset)) else [condition]
+    return pd.Index(vocabulary).isin(list(allowed))
+
+def _allowed_ages(condition):
+    ages = np.arange(*AGE_RANGE)
+    if condition is None:
+        return np.ones(len(ages), dtype=bool)
+    if isinstance(condition, tuple):
+        low, high = condition
+        return (ages >= (-np.inf if low is None else low)) & (ages < (np.inf if high is None else high))
+    return np.isin(ages, list(condition) if isinstance(condition, (list, set, frozenset)) else [condition])
+
+def _continuous_bounds(column, condition):
+    if not isinstance(condition, tuple) or len(condition) != 2:
+        raise ValueError(f"{column} takes a (low, high) range constraint")
+    low, high = condition
+    return -np.inf if low is None else low, np.inf if high is None else high
+
+def _truncated_uniform(rng, num_samples, low, high, bounds):
+    low, high = max(low, bounds[0]), min(high, bounds[1])
+    if low >= high:
+        raise ValueError("No records satisfy the constraints")
+    return rng.uniform(low, high, size=num_samples)
+
+def _truncated_normal(rng, num_samples, mean, std, bounds):
+    # Inverse-CDF draw restricted to [low, high): uniform between the bounds' CDF values,
+    # mapped back through the normal quantile function. Bounds above the mean are mirrored
+    # below it, where the CDF keeps its precision far into the tail.
+    from scipy.special import ndtr, ndtri
+
+    a, b = (bounds[0] - mean) / std, (bounds[1] - mean) / std
+    mirrored = a > 0
+    if mirrored:
+        a, b = -b, -a
+    low, high = ndtr(a), ndtr(b)
+    if not high > low:
+        raise ValueError("No records satisfy the constraints")
+    z = np.clip(ndtri(low + rng.random(num_samples) * (high - low)), a, b)
+    return mean + std * (-z if mirrored else z)
+
+def _clip_float32(values, bounds):
+    # Cast to float32 without rounding onto or across the constraint bounds
+    values = values.astype(np.float32)
+    low, high = bounds
+    if np.isfinite(low):
+        low32 = np.float32(low)
+        values = np.maximum(values, low32 if low32 >= low else np.nextafter(low32, np.float32(np.inf)))
+    if np.isfinite(high):
+        values = np.minimum(values, np.nextafter(np.float32(high), np.float32(-np.inf)))
+    return values
+
+def _sample_cells(rng, num_samples, weights):
+    # Indices of num_samples draws from the (unnormalized) weights, by inverting their CDF
+    cumulative = np.cumsum(weights)
+    if not len(cumulative) or cumulative[-1] <= 0:
+        raise ValueError("No records satisfy the constraints")
+    cells = np.searchsorted(cumulative, rng.random(num_samples) * cumulative[-1], side='right')
+    return np.minimum(cells, len(weights) - 1)
+
+def _age_segments(rule_table, allowed_ages):
+    # Split the allowed ages at the rules' Age breakpoints: inside a segment every rule sees
+    # the same outcome, so one representative age stands for the whole segment
+    ages = np.arange(*AGE_RANGE)[allowed_ages]
+    segment_ids = np.searchsorted(rule_table.breakpoints('Age'), ages, side='right')
+    starts = np.flatnonzero(np.r_[True, segment_ids[1:] != segment_ids[:-1]])
+    counts = np.diff(np.r_[starts, len(ages)])
+    return ages, starts, counts
+
+def generate_conditional_data(num_samples, G, constraints, seed=None, start_id=1, rules=None):
+    """
+    Draw num_samples records directly from the generator's distribution conditioned on
+    constraints, a {column: condition} mapping, so a rare cohort costs the same as a
+    common one instead of growing with the rejection rate of generate-and-filter.
+
+    Variant and disease are drawn jointly from P(variant) P(disease | variant) restricted
+    to the allowed pairs, which also inverts the knowledge graph when only diseases are
+    constrained. A Disease_Risk constraint is resolved by evaluating the rule table once per
+    (age segment, gender, variant, disease) cell and sampling the matching cells. Numeric
+    columns are drawn from their truncated distributions. Raises ValueError when no record
+    can satisfy the constraints.
+    """
+    unknown = set(constraints) - set(CATEGORICAL_CONSTRAINT_COLUMNS) - set(CONTINUOUS_CONSTRAINT_COLUMNS) - {'Age'}
+    if unknown:
+        raise ValueError(f"Unsupported constraint columns: {sorted(unknown)}")
+    rng = seed if isinstance(seed, np.random.Generator) else np.random.default_rng(seed)
+    graph, rule_table = _columnar_tables(G, rules)
+    vocabulary = vocabularies(graph, rule_table)
+
+    allowed = {column: _allowed_mask(vocabulary[column], constraints[column]) if column in constraints
+               else np.ones(len(vocabulary[column]), dtype=bool)
+               for column in ('Gender', 'Genetic_Variant', 'Disease')}
+    variant_idx, disease_idx = np.flatnonzero(allowed['Genetic_Variant']), np.flatnonzero(allowed['Disease'])
+    gender_idx = np.flatnonzero(allowed['Gender'])
+    # P(disease | variant) over the allowed pairs; variants are uniform, so this is the joint
+    pair_weights = graph.probabilities[np.ix_(variant_idx, disease_idx)].ravel()
+    ages, segment_starts, segment_counts = _age_segments(rule_table, _allowed_ages(constraints.get('Age')))
+    if not len(ages) or not len(gender_idx):
+        raise ValueError("No records satisfy the constraints")
+
+    if 'Disease_Risk' in constraints:
+        num_pairs, num_genders = len(pair_weights), len(gender_idx)
+        segment, gender, pair = (axis.ravel() for axis in np.meshgrid(
+            np.arange(len(segment_starts)), np.arange(num_genders), np.arange(num_pairs), indexing='ij'))
+        pair_variant, pair_disease = variant_idx[pair // len(disease_idx)], disease_idx[pair % len(disease_idx)]
+        risk = rule_table.apply_codes({
+            'Age': ages[segment_starts[segment]],
+            'Gender': categorical(gender_idx[gender], vocabulary['Gender']),
+            'Genetic_Variant': categorical(pair_variant, vocabulary['Genetic_Variant']),
+            'Disease': categorical(pair_disease, vocabulary['Disease']),
+        })['Disease_Risk']
+        risk_allowed = _allowed_mask(vocabulary['Disease_Risk'], constraints['Disease_Risk'])
+        cells = _sample_cells(rng, num_samples, np.where(risk_allowed[risk], segment_counts[segment] * pair_weights[pair], 0.0))
+        segment, gender_code, variant_code, disease_code = segment[cells], gender_idx[gender[cells]], pair_variant[cells], pair_disease[cells]
+    else:
+        pairs = _sample_cells(rng, num_samples, pair_weights)
+        variant_code, disease_code = variant_idx[pairs // len(disease_idx)], disease_idx[pairs % len(disease_idx)]
+        gender_code = gender_idx[rng.integers(0, len(gender_idx), size=num_samples)]
+        segment = _sample_cells(rng, num_samples, segment_counts)
+    # Uniform age within the drawn segment
+    age = ages[segment_starts[segment] + (rng.random(num_samples) * segment_counts[segment]).astype(np.intp)].astype(np.uint8)
+
+    gender = categorical(gender_code, vocabulary['Gender'])
+    variant = categorical(variant_code, vocabulary['Genetic_Variant'])
+    disease = categorical(disease_code, vocabulary['Disease'])
+    facts = rule_table.apply_codes({'Age': age, 'Gender': gender, 'Genetic_Variant': variant, 'Disease': disease})
+
+    numeric = {}
+    for column in CONTINUOUS_CONSTRAINT_COLUMNS:
+        bounds = _continuous_bounds(column, constraints[column]) if column in constraints else (-np.inf, np.inf)
+        if column == 'Risk_Score':
+            values = _truncated_uniform(rng, num_samples, *RISK_SCORE_RANGE, bounds)
+        elif column in constraints:
+            values = _truncated_normal(rng, num_samples, *LAB_RESULT_DISTRIBUTIONS[column], bounds)
+        else:
+            values = rng.normal(*LAB_RESULT_DISTRIBUTIONS[column], size=num_samples)
+        numeric[column] = _clip_float32(values, bounds)
+
+    return pd.DataFrame({
+        'Patient_ID': np.arange(start_id, start_id + num_samples, dtype=np.uint32),
+        'Age': age,
+        'Gender': gender,
+        'Genetic_Variant': variant,
+        'Disease_Risk': categorical(facts['Disease_Risk'], vocabulary['Disease_Risk']),
+        'Disease': disease,
+        **numeric,
+    })
+
+def write_synthetic_data(path, num_samples, G, chunk_size=100_000, seed=None, file_format=None, rules=None,
+                         compression=None):
+    """
+    Stream the synthetic dataset straight to a CSV (optionally gzip/zstd), Parquet or Feather
+    file, one chunk at a time, via export.export_data. The format and CSV compression are
+    taken from the file name unless file_format is given. Returns the number of rows written.
+    """
+    from export import export_data, infer_export_format
+
+    if file_format is None:
+        file_format, inferred_compression = infer_export_format(path)
+        compression = compression or inferred_compression
+    chunks = iter_synthetic_data(num_samples, G, chunk_size, seed, output='arrow', rules=rules)
+    return export_data(chunks, path, file_format, compression)
@@ -1,78 +1,704 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import pandas as pd
-from scipy.stats import ks_2samp, ttest_ind
-import matplotlib.pyplot as plt
-import seaborn as sns
+
+class MomentAccumulator:
+    """
+    Mergeable running moments (count, mean, M2, M3) for a fixed set of numeric columns.
+    update() folds in a whole chunk with one vectorized pass over its [rows, columns] array
+    and merge() combines partial results with the Chan/Pebay pairwise formulas, so chunks
+    or shards can be processed in any order, in parallel, and merged afterwards.
+    NaNs are skipped per column, as pandas does.
+    """
+    def __init__(self, columns):
+        self.columns = list(columns)
+        k = len(self.columns)
+        self.count = np.zeros(k)
+        self.mean = np.zeros(k)
+        self.m2 = np.zeros(k)
+        self.m3 = np.zeros(k)
+
+    def update(self, chunk):
+        values = np.asarray(chunk[self.columns], dtype=np.float64)
+        valid = ~np.isnan(values)
+        other = MomentAccumulator(self.columns)
+        other.count = valid.sum(axis=0).astype(np.float64)
+        other.mean = np.where(valid, values, 0.0).sum(axis=0) / np.maximum(other.count, 1)
+        deviations = np.where(valid, values - other.mean, 0.0)
+        squared = deviations * deviations
+        other.m2 = squared.sum(axis=0)
+        other.m3 = (squared * deviations).sum(axis=0)
+        return self.merge(other)
+
+    def merge(self, other):
+        n_a, n_b = self.count, other.count
+        n = n_a + n_b
+        safe_n = np.maximum(n, 1)
+        delta = other.mean - self.mean
+        mean = self.mean + delta * n_b / safe_n
+        m2 = self.m2 + other.m2 + delta ** 2 * n_a * n_b / safe_n
+        m3 = (self.m3 + other.m3
+              + delta ** 3 * n_a * n_b * (n_a - n_b) / safe_n ** 2
+              + 3 * delta * (n_a * other.m2 - n_b * self.m2) / safe_n)
+        self.count, self.mean, self.m2, self.m3 = n, mean, m2, m3
+        return self
+
+    def result(self):
+        """
+        Per-column count, mean, population variance (as np.var) and bias-corrected sample
+        skewness (as pandas Series.skew).
+        """
+        n = self.count
+        with np.errstate(divide='ignore', invalid='ignore'):
+            variance = np.where(n > 0, self.m2 / n, np.nan)
+            g1 = np.where(variance > 0, (self.m3 / n) / variance ** 1.5, 0.0)
+            skewness = np.where(n > 2, g1 * np.sqrt(n * (n - 1)) / (n - 2), np.nan)
+        return pd.DataFrame({
+            'count': n,
+            'mean': np.where(n > 0, self.mean, np.nan),
+            'variance': variance,
+            'skewness': skewness,
+        }, index=self.columns)
+
+def numeric_columns(data):
+    return list(data.select_dtypes(include='number').columns)
+
+def _iter_chunks(data, chunk_size):
+    # A DataFrame is sliced into chunks; anything else is already a chunk stream
+    if isinstance(data, pd.DataFrame):
+        for start in range(0, len(data), chunk_size):
+            yield data.iloc[start:start + chunk_size]
+    else:
+        for chunk in data:
+            yield chunk if isinstance(chunk, pd.DataFrame) else chunk.to_pandas()
+
+def _path_moments(path, columns, chunk_size):
+    from export import iter_file_chunks
+
+    accumulator = MomentAccumulator(columns)
+    for chunk in iter_file_chunks(path, chunk_size):
+        accumulator.update(chunk)
+    return accumulator
+
+def compute_moments(data, columns=None, chunk_size=1_000_000, workers=None):
+    """
+    All moments for all numeric columns in one pass. data is a DataFrame, a stream of
+    DataFrame/RecordBatch chunks, or a list of file paths (CSV/Parquet/Feather shards).
+    With workers, paths are reduced in a process pool, each worker reading its own shards,
+    and the partial results are merged. Returns the accumulator; see result().
+    """
+    if isinstance(data, (list, tuple)) and data and isinstance(data[0], (str, os.PathLike)):
+        if columns is None:
+            from export import iter_file_chunks
+            columns = numeric_columns(next(iter_file_chunks(data[0], 1)))
+        if workers and workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                partials = list(executor.map(_path_moments, data, [columns] * len(data), [chunk_size] * len(data)))
+        else:
+            partials = [_path_moments(path, columns, chunk_size) for path in data]
+        accumulator = MomentAccumulator(columns)
+        for partial in partials:
+            accumulator.merge(partial)
+        return accumulator
+
+    accumulator = None
+    for chunk in _iter_chunks(data, chunk_size):
+        if accumulator is None:
+            accumulator = MomentAccumulator(numeric_columns(chunk) if columns is None else columns)
+        accumulator.update(chunk)
+    return accumulator if accumulator is not None else MomentAccumulator(columns or [])
 
 # Function for Distributional Consistency
-def calculate_distributional_consistency(real_data, synthetic_data):
+def calculate_distributional_consistency(real_data, synthetic_data, verbose=False, chunk_size=1_000_000, workers=None):
     """
     Calculate distributional consistency by comparing statistical moments (mean, variance, skewness)
-    of real and synthetic data for each attribute.
+    of real and synthetic data for each numeric attribute. Both inputs may be DataFrames,
+    chunk streams or lists of shard files (see compute_moments); each is read once.
     """
-    print("=== Distributional Consistency Report ===")
-    consistency_report = {}
-    attributes = real_data.columns
+    real_moments = compute_moments(real_data, chunk_size=chunk_size, workers=workers).result()
+    attributes = list(real_moments.index)
+    synthetic_moments = compute_moments(synthetic_data, columns=attributes, chunk_size=chunk_size, workers=workers).result()
 
-    for attr in attributes:
-        real_mean = np.mean(real_data[attr])
-        synthetic_mean = np.mean(synthetic_data[attr])
-        real_variance = np.var(real_data[attr])
-        synthetic_variance = np.var(synthetic_data[attr])
-        real_skewness = real_data[attr].skew()
-        synthetic_skewness = synthetic_data[attr].skew()
-
-        print(f"\nAttribute: {attr}")
-        print(f"  Real Mean: {real_mean}, Synthetic Mean: {synthetic_mean}")
-        print(f"  Real Variance: {real_variance}, Synthetic Variance: {synthetic_variance}")
-        print(f"  Real Skewness: {real_skewness}, Synthetic Skewness: {synthetic_skewness}")
-
-        consistency_report[attr] = {
-            'real_mean': real_mean,
-            'synthetic_mean': synthetic_mean,
-            'real_variance': real_variance,
-            'synthetic_variance': synthetic_variance,
-            'real_skewness': real_skewness,
-            'synthetic_skewness': synthetic_skewness
-        }
-        
-    return pd.DataFrame(consistency_report).T
+    consistency_report = pd.DataFrame({
+        'real_mean': real_moments['mean'],
+        'synthetic_mean': synthetic_moments['mean'],
+        'real_variance': real_moments['variance'],
+        'synthetic_variance': synthetic_moments['variance'],
+        'real_skewness': real_moments['skewness'],
+        'synthetic_skewness': synthetic_moments['skewness'],
+    })
+
+    if verbose:
+        print("=== Distributional Consistency Report ===")
+        for attr, row in consistency_report.iterrows():
+            print(f"\nAttribute: {attr}")
+            print(f"  Real Mean: {row['real_mean']}, Synthetic Mean: {row['synthetic_mean']}")
+            print(f"  Real Variance: {row['real_variance']}, Synthetic Variance: {row['synthetic_variance']}")
+            print(f"  Real Skewness: {row['real_skewness']}, Synthetic Skewness: {row['synthetic_skewness']}")
+
+    return consistency_report
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch built from a hierarchy of compactors: level h holds items of
+    weight 2**h, and a level that grows past capacity is sorted and every other item is
+    promoted to the next level. Each such compaction moves any rank by at most 2**h, and
+    these amounts are summed in rank_error, so cdf() is always within error_bound()
+    (a fraction of count) of the exact empirical CDF.
+    """
+    def __init__(self, capacity=4096):
+        self.capacity = capacity
+        self.levels = [np.empty(0)]
+        self.count = 0
+        self.rank_error = 0
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self.count += len(values)
+        self._compress()
+        return self
+
+    def merge(self, other):
+        for h, level in enumerate(other.levels):
+            if h == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[h] = np.concatenate([self.levels[h], level])
+        self.count += other.count
+        self.rank_error += other.rank_error
+        self._compress()
+        return self
+
+    def _compress(self):
+        h = 0
+        while h < len(self.levels):
+            level = self.levels[h]
+            if len(level) > self.capacity:
+                level = np.sort(level)
+                # An odd item out stays behind; alternate the kept parity between compactions
+                # so the rounding does not drift in one direction
+                leftover, pairs = level[:len(level) % 2], level[len(level) % 2:]
+                offset = (self.rank_error >> h) & 1
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], pairs[offset::2]])
+                self.levels[h] = leftover
+                self.rank_error += 2 ** h
+            h += 1
+
+    def error_bound(self):
+        return self.rank_error / self.count if self.count else 0.0
+
+    def points(self):
+        return np.unique(np.concatenate(self.levels))
+
+    def cdf(self, x):
+        x = np.asarray(x, dtype=np.float64)
+        rank = np.zeros(x.shape)
+        for h, level in enumerate(self.levels):
+            if len(level):
+                rank += (2 ** h) * np.searchsorted(np.sort(level), x, side='right')
+        return rank / max(self.count, 1)
+
+def sketch_ks_2samp(real_sketch, synthetic_sketch):
+    """
+    Two-sample K-S statistic from two quantile sketches, with its asymptotic p-value and
+    the bound on |statistic - exact statistic| implied by the sketches' rank errors.
+    """
+    from scipy.stats import kstwobign
+
+    points = np.union1d(real_sketch.points(), synthetic_sketch.points())
+    statistic = float(np.max(np.abs(real_sketch.cdf(points) - synthetic_sketch.cdf(points)))) if len(points) else 0.0
+    n, m = real_sketch.count, synthetic_sketch.count
+    p_value = float(kstwobign.sf(statistic * np.sqrt(n * m / (n + m)))) if n and m else np.nan
+    return statistic, p_value, real_sketch.error_bound() + synthetic_sketch.error_bound()
+
+def _is_numeric(series):
+    return pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+
+def _test_row(attr, kind, test, statistic, p_value, error_bound=0.0):
+    return {'attribute': attr, 'kind': kind, 'test': test, 'statistic': float(statistic),
+            'p_value': float(p_value), 'error_bound': float(error_bound)}
+
+def _categorical_tests(attr, real_counts, synthetic_counts):
+    from scipy.stats import chi2_contingency
+
+    table = pd.concat([real_counts, synthetic_counts], axis=1).fillna(0)
+    table = table[(table > 0).any(axis=1)]
+    real_p = table.iloc[:, 0] / max(table.iloc[:, 0].sum(), 1)
+    synthetic_p = table.iloc[:, 1] / max(table.iloc[:, 1].sum(), 1)
+    tvd = 0.5 * float(np.abs(real_p - synthetic_p).sum())
+    if len(table) > 1:
+        chi2, p_value, _, _ = chi2_contingency(table.T.values)
+    else:
+        chi2, p_value = 0.0, 1.0
+    return [
+        _test_row(attr, 'categorical', 'chi_square', chi2, p_value),
+        _test_row(attr, 'categorical', 'total_variation', tvd, np.nan),
+    ]
+
+def _numeric_sketch_tests(attr, real_sketch, synthetic_sketch, real_moments, synthetic_moments):
+    from scipy.stats import ttest_ind_from_stats
+
+    ks_stat, ks_p_value, error_bound = sketch_ks_2samp(real_sketch, synthetic_sketch)
+    real_row, synthetic_row = real_moments.loc[attr], synthetic_moments.loc[attr]
+    # Welch t-test from the streamed moments; ddof=1 standard deviations as ttest_ind uses
+    t_stat, t_p_value = ttest_ind_from_stats(
+        real_row['mean'], np.sqrt(real_row['variance'] * real_row['count'] / max(real_row['count'] - 1, 1)), real_row['count'],
+        synthetic_row['mean'], np.sqrt(synthetic_row['variance'] * synthetic_row['count'] / max(synthetic_row['count'] - 1, 1)), synthetic_row['count'],
+        equal_var=False,
+    )
+    return [
+        _test_row(attr, 'numeric', 'ks_sketch', ks_stat, ks_p_value, error_bound),
+        _test_row(attr, 'numeric', 't_test', t_stat, t_p_value),
+    ]
+
+def _column_tests(task):
+    attr, real_values, synthetic_values, method, capacity = task
+    if not _is_numeric(real_values):
+        return _categorical_tests(attr, real_values.value_counts(), synthetic_values.value_counts())
+    if method == 'exact':
+        from scipy.stats import ks_2samp, ttest_ind
+
+        ks_stat, ks_p_value = ks_2samp(real_values.dropna(), synthetic_values.dropna())
+        t_stat, t_p_value = ttest_ind(real_values.dropna(), synthetic_values.dropna(), equal_var=False)
+        return [
+            _test_row(attr, 'numeric', 'ks', ks_stat, ks_p_value),
+            _test_row(attr, 'numeric', 't_test', t_stat, t_p_value),
+        ]
+    real_moments = MomentAccumulator([attr]).update(real_values.to_frame()).result()
+    synthetic_moments = MomentAccumulator([attr]).update(synthetic_values.to_frame()).result()
+    return _numeric_sketch_tests(attr, QuantileSketch(capacity).update(real_values), QuantileSketch(capacity).update(synthetic_values),
+                                 real_moments, synthetic_moments)
+
+def _stream_summary(data, attributes, capacity, chunk_size):
+    # One pass over a chunk stream: sketches and moments for numeric columns, counts otherwise.
+    # attributes=None takes every column of the first chunk.
+    sketches, counts, moments = {}, {}, None
+    for chunk in _iter_chunks(data, chunk_size):
+        if moments is None:
+            attributes = list(chunk.columns) if attributes is None else attributes
+            numeric = [attr for attr in attributes if _is_numeric(chunk[attr])]
+            moments = MomentAccumulator(numeric)
+            sketches = {attr: QuantileSketch(capacity) for attr in numeric}
+            counts = {attr: pd.Series(dtype=np.float64) for attr in attributes if attr not in sketches}
+        moments.update(chunk)
+        for attr, sketch in sketches.items():
+            sketch.update(chunk[attr])
+        for attr in counts:
+            counts[attr] = counts[attr].add(chunk[attr].value_counts(), fill_value=0)
+    if moments is None:
+        raise ValueError("Cannot test an empty chunk stream")
+    return attributes, sketches, counts, moments.result()
 
 # Function for Statistical Tests
-def perform_statistical_tests(real_data, synthetic_data):
+def perform_statistical_tests(real_data, synthetic_data, method='exact', workers=None, sketch_capacity=4096,
+                              chunk_size=1_000_000):
     """
-    Perform Kolmogorov-Smirnov (K-S) and T-tests for statistical alignment.
-    Returns a dictionary of test results.
+    Compare real and synthetic data column by column and return one tidy frame with a row per
+    (attribute, test): attribute, kind, test, statistic, p_value, error_bound.
+
+    Numeric columns get a Kolmogorov-Smirnov test and a Welch T-test. method='exact' uses
+    scipy's ks_2samp; method='sketch' estimates K-S from mergeable quantile sketches, with
+    error_bound bounding the statistic's deviation from the exact value, and the T-test from
+    streamed moments. Categorical columns get a chi-square test and the total variation
+    distance. With method='sketch' both inputs may also be chunk streams. workers runs the
+    columns of DataFrame inputs in a process pool.
     """
-    print("\n=== Statistical Test Results ===")
-    test_results = {}
-    attributes = real_data.columns
+    if method not in ('exact', 'sketch'):
+        raise ValueError(f"Unknown test method: {method!r}")
 
-    for attr in attributes:
-        # Kolmogorov-Smirnov test for distributional similarity
-        ks_stat, ks_p_value = ks_2samp(real_data[attr], synthetic_data[attr])
-
-        # T-test for mean differences
-        t_stat, t_p_value = ttest_ind(real_data[attr], synthetic_data[attr], equal_var=False)
-
-        print(f"\nAttribute: {attr}")
-        print(f"  K-S Statistic: {ks_stat}, K-S p-value: {ks_p_value}")
-        print(f"  T-Statistic: {t_stat}, T-Test p-value: {t_p_value}")
-
-        test_results[attr] = {
-            'ks_statistic': ks_stat,
-            'ks_p_value': ks_p_value,
-            't_statistic': t_stat,
-            't_p_value': t_p_value
-        }
-    
-    return pd.DataFrame(test_results).T
+    if isinstance(real_data, pd.DataFrame) and isinstance(synthetic_data, pd.DataFrame):
+        attributes = [attr for attr in real_data.columns if attr in synthetic_data.columns]
+        tasks = [(attr, real_data[attr], synthetic_data[attr], method, sketch_capacity) for attr in attributes]
+        if workers and workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(_column_tests, tasks))
+        else:
+            results = [_column_tests(task) for task in tasks]
+        rows = [row for result in results for row in result]
+    else:
+        if method != 'sketch':
+            raise ValueError("Chunk streams can only be tested with method='sketch'")
+        attributes, real_sketches, real_counts, real_moments = _stream_summary(real_data, None, sketch_capacity, chunk_size)
+        _, synthetic_sketches, synthetic_counts, synthetic_moments = _stream_summary(synthetic_data, attributes, sketch_capacity, chunk_size)
+        rows = []
+        for attr in attributes:
+            if attr in real_sketches:
+                rows += _numeric_sketch_tests(attr, real_sketches[attr], synthetic_sketches[attr], real_moments, synthetic_moments)
+            else:
+                rows += _categorical_tests(attr, real_counts[attr], synthetic_counts[attr])
+
+    return pd.DataFrame(rows, columns=['attribute', 'kind', 'test', 'statistic', 'p_value', 'error_bound'])
+
+# Multivariate Fidelity and Privacy
+IDENTIFIER_COLUMNS = ('Patient_ID',)
+KDTREE_MAX_DIMS = 20
+EXACT_MATCH_TOLERANCE = 1e-6
+
+def _shared_columns(real_data, synthetic_data, columns):
+    if columns is not None:
+        return list(columns)
+    return [col for col in real_data.columns if col in synthetic_data.columns and col not in IDENTIFIER_COLUMNS]
+
+def _cramers_v(x, y):
+    table = pd.crosstab(x, y).values.astype(np.float64)
+    # Unobserved categories of categorical columns would give zero expected counts
+    table = table[table.sum(axis=1) > 0][:, table.sum(axis=0) > 0]
+    n = table.sum()
+    if n == 0 or min(table.shape) < 2:
+        return 0.0
+    expected = table.sum(axis=1, keepdims=True) * table.sum(axis=0, keepdims=True) / n
+    chi2 = ((table - expected) ** 2 / expected).sum()
+    return float(np.sqrt(chi2 / n / (min(table.shape) - 1)))
+
+def _correlation_ratio(categories, values):
+    # Share of the variance of values explained by the category means (eta)
+    frame = pd.DataFrame({'category': np.asarray(categories), 'value': np.asarray(values, dtype=np.float64)}).dropna()
+    total = frame['value'].var(ddof=0) * len(frame)
+    if not total:
+        return 0.0
+    groups = frame.groupby('category', observed=True)['value'].agg(['count', 'mean'])
+    between = (groups['count'] * (groups['mean'] - frame['value'].mean()) ** 2).sum()
+    return float(np.sqrt(between / total))
+
+def association_matrix(data, columns=None):
+    """
+    Pairwise association between columns: Pearson correlation between numeric columns,
+    Cramer's V between categorical columns and the correlation ratio between a categorical
+    and a numeric column. Each is computed from one vectorized pass (corr, crosstab, groupby).
+    """
+    columns = [col for col in data.columns if col not in IDENTIFIER_COLUMNS] if columns is None else list(columns)
+    numeric = [col for col in columns if _is_numeric(data[col])]
+    matrix = pd.DataFrame(np.eye(len(columns)), index=columns, columns=columns)
+    if numeric:
+        matrix.loc[numeric, numeric] = data[numeric].corr().values
+    for i, first in enumerate(columns):
+        for second in columns[i + 1:]:
+            if first in numeric and second in numeric:
+                continue
+            if first in numeric:
+                value = _correlation_ratio(data[second], data[first])
+            elif second in numeric:
+                value = _correlation_ratio(data[first], data[second])
+            else:
+                value = _cramers_v(data[first], data[second])
+            matrix.loc[first, second] = matrix.loc[second, first] = value
+    return matrix
+
+def calculate_association_deltas(real_data, synthetic_data, columns=None):
+    """
+    Synthetic minus real association matrix (see association_matrix). Large absolute
+    entries mark column pairs whose joint structure the synthetic data does not preserve.
+    """
+    columns = _shared_columns(real_data, synthetic_data, columns)
+    return association_matrix(synthetic_data, columns) - association_matrix(real_data, columns)
+
+class FeatureEncoder:
+    """
+    Maps records to points for distance-based metrics: numeric columns standardized with the
+    real data's mean and standard deviation, categorical columns one-hot encoded over the real
+    vocabulary. One-hot entries are scaled by 1/sqrt(2) so that a mismatched category adds 1
+    to the squared distance, the same as a one standard deviation numeric difference.
+    """
+    def __init__(self, data, columns):
+        self.numeric = [col for col in columns if _is_numeric(data[col])]
+        self.categorical = [col for col in columns if col not in self.numeric]
+        values = data[self.numeric].astype(np.float64)
+        self.mean = values.mean().fillna(0.0).values
+        self.std = values.std(ddof=0).replace(0, 1).fillna(1.0).values
+        self.vocabularies = {col: pd.Index(pd.unique(data[col].dropna())) for col in self.categorical}
+        self.dims = len(self.numeric) + sum(len(vocabulary) for vocabulary in self.vocabularies.values())
+
+    def transform(self, data):
+        features = np.zeros((len(data), self.dims))
+        if self.numeric:
+            numeric = (data[self.numeric].to_numpy(dtype=np.float64) - self.mean) / self.std
+            features[:, :len(self.numeric)] = np.nan_to_num(numeric)
+        offset = len(self.numeric)
+        rows = np.arange(len(data))
+        for col, vocabulary in self.vocabularies.items():
+            codes = vocabulary.get_indexer(data[col])
+            known = codes >= 0
+            # Values outside the real vocabulary stay all-zero
+            features[rows[known], offset + codes[known]] = np.sqrt(0.5)
+            offset += len(vocabulary)
+        return features
+
+def _iter_features(encoder, data, chunk_size):
+    for start in range(0, len(data), chunk_size):
+        yield encoder.transform(data.iloc[start:start + chunk_size])
+
+def calculate_mmd(real_data, synthetic_data, columns=None, num_features=1024, bandwidth=None, seed=0,
+                  chunk_size=100_000):
+    """
+    Maximum mean discrepancy between real and synthetic records under a Gaussian kernel,
+    approximated with num_features random Fourier features: the mean feature embedding of
+    each dataset is accumulated chunk by chunk, so the cost is linear in the number of rows.
+    bandwidth defaults to the median pairwise distance of a real subsample. Records are
+    encoded with FeatureEncoder. Returns the (non-negative) MMD estimate.
+    """
+    from scipy.spatial.distance import pdist
+
+    columns = _shared_columns(real_data, synthetic_data, columns)
+    encoder = FeatureEncoder(real_data, columns)
+    rng = np.random.default_rng(seed)
+    if bandwidth is None:
+        subsample = real_data.iloc[rng.choice(len(real_data), size=min(len(real_data), 1000), replace=False)]
+        distances = pdist(encoder.transform(subsample))
+        bandwidth = float(np.median(distances[distances > 0])) if np.any(distances > 0) else 1.0
+    weights = rng.normal(scale=1.0 / bandwidth, size=(encoder.dims, num_features))
+    offsets = rng.uniform(0, 2 * np.pi, size=num_features)
+
+    def mean_embedding(data):
+        total = np.zeros(num_features)
+        for features in _iter_features(encoder, data, chunk_size):
+            total += np.cos(features @ weights + offsets).sum(axis=0)
+        return np.sqrt(2.0 / num_features) * total / max(len(data), 1)
+
+    difference = mean_embedding(real_data) - mean_embedding(synthetic_data)
+    return float(np.sqrt(difference @ difference))
+
+def _blocked_two_nearest(reference, queries, block_size):
+    # Running two smallest squared distances over blocks of the reference set
+    best = np.full((len(queries), 2), np.inf)
+    query_norms = (queries * queries).sum(axis=1)[:, None]
+    for start in range(0, len(reference), block_size):
+        block = reference[start:start + block_size]
+        squared = query_norms + (block * block).sum(axis=1)[None, :] - 2.0 * queries @ block.T
+        np.maximum(squared, 0.0, out=squared)
+        if squared.shape[1] > 2:
+            squared = np.partition(squared, 1, axis=1)[:, :2]
+        best = np.sort(np.concatenate([best, squared], axis=1), axis=1)[:, :2]
+    return np.sqrt(best)
+
+def distance_to_closest_record(real_data, synthetic_data, columns=None, method='auto', workers=-1,
+                               chunk_size=100_000, block_size=4096):
+    """
+    For every synthetic record, the distance to the closest real record (dcr) and the ratio of
+    the closest to the second closest distance (nndr), on FeatureEncoder points. A dcr of 0 is
+    a copied patient; an nndr near 0 singles one patient out.
+
+    method='kdtree' indexes the real records in a scipy cKDTree and queries synthetic chunks
+    with workers threads; method='blocked' computes exact distances block by block with
+    matrix products, which holds up better in high dimension. 'auto' picks the tree up to
+    KDTREE_MAX_DIMS encoded dimensions. Returns a frame indexed like synthetic_data.
+    """
+    if method not in ('auto', 'kdtree', 'blocked'):
+        raise ValueError(f"Unknown nearest-neighbour method: {method!r}")
+    columns = _shared_columns(real_data, synthetic_data, columns)
+    encoder = FeatureEncoder(real_data, columns)
+    reference = encoder.transform(real_data)
+    if method == 'auto':
+        method = 'kdtree' if encoder.dims <= KDTREE_MAX_DIMS else 'blocked'
+
+    if method == 'kdtree':
+        from scipy.spatial import cKDTree
+
+        tree = cKDTree(reference)
+        chunk_size = max(chunk_size, 1)
+    else:
+        chunk_size = max(min(chunk_size, block_size), 1)
+
+    distances = []
+    for queries in _iter_features(encoder, synthetic_data, chunk_size):
+        if method == 'kdtree':
+            nearest, _ = tree.query(queries, k=2, workers=workers)
+            distances.append(nearest.reshape(len(queries), 2))
+        else:
+            distances.append(_blocked_two_nearest(reference, queries, block_size))
+    distances = np.concatenate(distances) if distances else np.zeros((0, 2))
+
+    first, second = distances[:, 0], distances[:, 1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        nndr = np.where(second > 0, first / second, 1.0)
+    return pd.DataFrame({'dcr': first, 'nndr': nndr}, index=synthetic_data.index)
+
+def calculate_privacy_metrics(real_data, synthetic_data, holdout_data=None, columns=None, **kwargs):
+    """
+    Summary of distance_to_closest_record: the share of exact copies and low quantiles and
+    medians of dcr and nndr. With holdout_data (real records not used for training), the same
+    summary for the holdout is added as a baseline; synthetic records should be no closer to
+    the training data than unseen real records are. kwargs go to distance_to_closest_record.
+    """
+    def summary(data):
+        distances = distance_to_closest_record(real_data, data, columns=columns, **kwargs)
+        return pd.Series({
+            'exact_match_rate': float((distances['dcr'] <= EXACT_MATCH_TOLERANCE).mean()),
+            'dcr_p05': distances['dcr'].quantile(0.05),
+            'dcr_median': distances['dcr'].median(),
+            'nndr_p05': distances['nndr'].quantile(0.05),
+            'nndr_median': distances['nndr'].median(),
+        })
+
+    report = pd.DataFrame({'synthetic': summary(synthetic_data)})
+    if holdout_data is not None:
+        report['holdout'] = summary(holdout_data)
+    return report
+
+# Headless Report Rendering
+REPORT_FORMATS = ('png', 'svg', 'html')
+KDE_GRID_SIZE = 512
+
+def _binned_kde(values, low, high, grid_size=KDE_GRID_SIZE):
+    # Gaussian KDE (Scott's bandwidth) of a histogram on a fixed grid, smoothed by convolution,
+    # so its cost depends on the grid size and not on the number of values
+    grid_edges = np.linspace(low, high, grid_size + 1)
+    grid = 0.5 * (grid_edges[:-1] + grid_edges[1:])
+    n = len(values)
+    std = float(np.std(values)) if n else 0.0
+    if n < 2 or std == 0 or high <= low:
+        return grid, np.zeros(grid_size)
+    counts, _ = np.histogram(values, bins=grid_edges)
+    step = grid_edges[1] - grid_edges[0]
+    bandwidth = std * n ** (-1.0 / 5)
+    half_width = min(int(np.ceil(4 * bandwidth / step)), grid_size)
+    offsets = np.arange(-half_width, half_width + 1) * step
+    kernel = np.exp(-0.5 * (offsets / bandwidth) ** 2)
+    # The kernel can be longer than the grid, where mode='same' would return the kernel's
+    # length; the centred grid_size slice of the full convolution is right for any width
+    density = np.convolve(counts, kernel, mode='full')[half_width:half_width + grid_size]
+    return grid, density / (density.sum() * step)
+
+def _box_stats(values, label):
+    # Summary for Axes.bxp: quartiles and 1.5 IQR whiskers clipped to the data
+    q1, median, q3 = np.quantile(values, [0.25, 0.5, 0.75])
+    iqr = q3 - q1
+    inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+    return {'label': label, 'q1': q1, 'med': median, 'q3': q3,
+            'whislo': inside.min(), 'whishi': inside.max(), 'fliers': []}
+
+def prebin_distribution(attr, real_values, synthetic_values, bins=50):
+    """
+    Everything needed to plot one attribute, computed with numpy in one pass per dataset:
+    shared-edge density histograms, box-plot quantiles and a binned KDE for numeric columns,
+    category frequencies otherwise. The result is small whatever the number of rows.
+    """
+    if not _is_numeric(real_values):
+        real_p = real_values.value_counts(normalize=True)
+        synthetic_p = synthetic_values.value_counts(normalize=True)
+        table = pd.concat([real_p, synthetic_p], axis=1).fillna(0)
+        return {'attr': attr, 'kind': 'categorical', 'categories': [str(c) for c in table.index],
+                'real': table.iloc[:, 0].values, 'synthetic': table.iloc[:, 1].values}
+
+    real = real_values.dropna().to_numpy(dtype=np.float64)
+    synthetic = synthetic_values.dropna().to_numpy(dtype=np.float64)
+    extremes = [bound for values in (real, synthetic) if len(values) for bound in (values.min(), values.max())]
+    low, high = (float(min(extremes)), float(max(extremes))) if extremes else (0.0, 1.0)
+    edges = np.linspace(low, high, bins + 1)
+    summary = {'attr': attr, 'kind': 'numeric', 'edges': edges, 'box': []}
+    for name, values, label in (('real', real, 'Real Data'), ('synthetic', synthetic, 'Synthetic Data')):
+        summary[name] = np.histogram(values, bins=edges, density=len(values) > 0)[0]
+        summary[name + '_kde'] = _binned_kde(values, low, high)
+        if len(values):
+            summary['box'].append(_box_stats(values, f"{label.split()[0]} {attr}"))
+    return summary
+
+def _render_figures(summary):
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    attr = summary['attr']
+    figures = {}
+    histogram = Figure(figsize=(10, 5))
+    FigureCanvasAgg(histogram)
+    ax = histogram.add_subplot()
+    if summary['kind'] == 'categorical':
+        positions = np.arange(len(summary['categories']))
+        ax.bar(positions - 0.2, summary['real'], width=0.4, color='blue', alpha=0.6, label='Real Data')
+        ax.bar(positions + 0.2, summary['synthetic'], width=0.4, color='orange', alpha=0.6, label='Synthetic Data')
+        ax.set_xticks(positions, summary['categories'], rotation=45, ha='right')
+        ax.set_ylabel('Proportion')
+    else:
+        edges = summary['edges']
+        for name, color, label in (('real', 'blue', 'Real Data'), ('synthetic', 'orange', 'Synthetic Data')):
+            ax.stairs(summary[name], edges, fill=True, color=color, alpha=0.4, label=label)
+            ax.plot(*summary[name + '_kde'], color=color)
+        ax.set_ylabel('Density')
+    ax.set_title(f"Histogram Comparison for {attr}")
+    ax.set_xlabel(attr)
+    ax.legend()
+    histogram.tight_layout()
+    figures['histogram'] = histogram
+
+    if summary['kind'] == 'numeric' and summary['box']:
+        boxplot = Figure(figsize=(10, 5))
+        FigureCanvasAgg(boxplot)
+        ax = boxplot.add_subplot()
+        ax.bxp(summary['box'], showfliers=False)
+        ax.set_title(f"Box Plot Comparison for {attr}")
+        ax.set_ylabel(attr)
+        boxplot.tight_layout()
+        figures['boxplot'] = boxplot
+    return figures
+
+def _render_column(task):
+    summary, output_dir, fmt = task
+    import base64
+    from io import BytesIO
+
+    outputs = []
+    for kind, figure in _render_figures(summary).items():
+        if fmt == 'html':
+            buffer = BytesIO()
+            figure.savefig(buffer, format='png')
+            outputs.append(base64.b64encode(buffer.getvalue()).decode('ascii'))
+        else:
+            path = os.path.join(output_dir, f"{summary['attr']}_{kind}.{fmt}")
+            figure.savefig(path, format=fmt)
+            outputs.append(path)
+    return outputs
+
+def render_distribution_report(real_data, synthetic_data, attributes=None, output_dir='evaluation_report', fmt='png',
+                               bins=50, workers=None):
+    """
+    Render histogram and box plot comparisons without a display. Every column is prebinned
+    here (see prebin_distribution) and only the small summaries are drawn, on matplotlib's
+    non-interactive Agg canvas, optionally by a process pool of workers. fmt 'png' or 'svg'
+    writes one file per figure; 'html' writes a single report.html with the figures embedded.
+    Returns the written paths.
+    """
+    import html
+
+    if fmt not in REPORT_FORMATS:
+        raise ValueError(f"Unsupported report format: {fmt!r}")
+    if attributes is None:
+        attributes = [attr for attr in real_data.columns if attr in synthetic_data.columns and attr not in IDENTIFIER_COLUMNS]
+    os.makedirs(output_dir, exist_ok=True)
+
+    tasks = [(prebin_distribution(attr, real_data[attr], synthetic_data[attr], bins), output_dir, fmt) for attr in attributes]
+    if workers and workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_render_column, tasks))
+    else:
+        results = [_render_column(task) for task in tasks]
+
+    if fmt != 'html':
+        return [path for paths in results for path in paths]
+    sections = []
+    for attr, images in zip(attributes, results):
+        sections.append(f"<h2>{html.escape(str(attr))}</h2>\n" + "\n".join(
+            f'<img src="data:image/png;base64,{image}" alt="{html.escape(str(attr))}">' for image in images))
+    path = os.path.join(output_dir, 'report.html')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>Synthetic Data Distributions</title></head>\n<body>\n"
+                "<h1>Real vs Synthetic Distributions</h1>\n" + "\n".join(sections) + "\n</body></html>\n")
+    return [path]
 
 # Function for Qualitative Assessment
-def visualize_data_distributions(real_data, synthetic_data, attributes):
+def visualize_data_distributions(real_data, synthetic_data, attributes, output_dir=None, fmt='png', bins=50, workers=None):
     """
     Generate histograms and box plots for qualitative assessment of real vs synthetic data distributions.
+    With output_dir the figures are rendered headless to files instead (see render_distribution_report).
     """
+    if output_dir is not None:
+        return render_distribution_report(real_data, synthetic_data, attributes, output_dir, fmt=fmt, bins=bins, workers=workers)
+
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
     print("\n=== Qualitative Assessment ===")
     for attr in attributes:
         # Histogram comparison
@@ -112,6 +738,14 @@ def evaluate_synthetic_data(real_data, synthetic_data):
     print("\nStatistical Test Summary:")
     print(statistical_tests)
 
+    # Multivariate Fidelity and Privacy
+    print("\nLargest Association Deltas:")
+    deltas = calculate_association_deltas(real_data, synthetic_data).abs()
+    print(deltas.max().sort_values(ascending=False))
+    print(f"\nMMD (random Fourier features): {calculate_mmd(real_data, synthetic_data):.4f}")
+    print("\nPrivacy Summary:")
+    print(calculate_privacy_metrics(real_data, synthetic_data))
+
     # Qualitative Assessment (Visualizations)
     visualize_data_distributions(real_data, synthetic_data, real_data.columns)
 
@@ -0,0 +1,191 @@
+import itertools
+import json
+import os
+import pandas as pd
+from schema import data_dictionary
+
+EXPORT_FORMATS = ('csv', 'parquet', 'feather')
+CSV_COMPRESSIONS = (None, 'gzip', 'zstd')
+FILE_EXTENSIONS = {'csv': '.csv', 'parquet': '.parquet', 'feather': '.feather'}
+COMPRESSION_EXTENSIONS = {'gzip': '.gz', 'zstd': '.zst'}
+DATA_DICTIONARY_METADATA_KEY = b'data_dictionary'
+
+def export_file_name(stem, file_format, compression=None):
+    name = stem + FILE_EXTENSIONS[file_format]
+    if file_format == 'csv' and compression:
+        name += COMPRESSION_EXTENSIONS[compression]
+    return name
+
+def infer_export_format(path):
+    """
+    (file_format, compression) implied by a file name such as data.parquet or data.csv.gz.
+    """
+    name = str(path).lower()
+    compression = None
+    for codec, extension in COMPRESSION_EXTENSIONS.items():
+        if name.endswith(extension):
+            compression, name = codec, name[:-len(extension)]
+    suffix = os.path.splitext(name)[1]
+    file_format = {'.csv': 'csv', '.parquet': 'parquet', '.pq': 'parquet', '.feather': 'feather', '.arrow': 'feather'}.get(suffix)
+    if file_format is None:
+        raise ValueError(f"Cannot infer export format from {path!r}")
+    return file_format, compression
+
+def iter_frame_chunks(frame, chunk_size=100_000):
+    for start in range(0, len(frame), chunk_size):
+        yield frame.iloc[start:start + chunk_size]
+
+class _KeepOpen:
+    # Lets pyarrow close its stream without closing the caller's file object
+    def __init__(self, handle):
+        self._handle = handle
+        self.closed = False
+
+    def write(self, data):
+        return self._handle.write(data)
+
+    def flush(self):
+        self._handle.flush()
+
+    def close(self):
+        self._handle.flush()
+        self.closed = True
+
+def _record_batches(chunks, chunk_size):
+    import pyarrow as pa
+
+    if isinstance(chunks, pd.DataFrame):
+        chunks = iter_frame_chunks(chunks, chunk_size)
+    schema = None
+    for chunk in chunks:
+        if isinstance(chunk, pd.DataFrame):
+            # Later chunks are converted against the first chunk's schema so every batch matches
+            batch = pa.RecordBatch.from_pandas(chunk, schema=schema, preserve_index=False)
+        else:
+            batch = chunk if schema is None else pa.Table.from_batches([chunk]).cast(schema).to_batches()[0]
+        if schema is None:
+            schema = batch.schema
+        yield batch
+
+def _dictionary_metadata(schema, dictionary):
+    if dictionary is None:
+        return schema
+    payload = json.dumps(dictionary.to_dict(orient='records')).encode('utf-8')
+    return schema.with_metadata({**(schema.metadata or {}), DATA_DICTIONARY_METADATA_KEY: payload})
+
+def export_data(chunks, sink, file_format='parquet', compression=None, include_data_dictionary=True, chunk_size=100_000):
+    """
+    Write a DataFrame or a stream of DataFrame/RecordBatch chunks (e.g. iter_synthetic_data)
+    to sink - a path or a writable binary file object - one chunk at a time, so memory stays
+    at roughly one chunk whatever the dataset size.
+
+    CSV may be gzip or zstd compressed. Parquet uses compression as its codec (default
+    snappy), Feather as its IPC buffer compression (lz4 or zstd). For Parquet and Feather
+    the data dictionary is stored in the schema metadata under 'data_dictionary'; CSV has
+    no place for it, see write_data_dictionary. Returns the number of rows written.
+    """
+    import pyarrow as pa
+
+    if file_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {file_format!r}")
+    if file_format == 'csv' and compression not in CSV_COMPRESSIONS:
+        raise ValueError(f"Unsupported CSV compression: {compression!r}")
+
+    batches = _record_batches(chunks, chunk_size)
+    first = next(batches, None)
+    if first is None:
+        raise ValueError("Nothing to export")
+    dictionary = data_dictionary(first.schema.names) if include_data_dictionary else None
+
+    rows_written = 0
+    output = pa.OSFile(str(sink), 'wb') if isinstance(sink, (str, os.PathLike)) else pa.PythonFile(_KeepOpen(sink), mode='w')
+    try:
+        if file_format == 'csv':
+            import pyarrow.csv as pa_csv
+
+            stream = pa.CompressedOutputStream(output, compression) if compression else output
+            writer = pa_csv.CSVWriter(stream, first.schema)
+        elif file_format == 'parquet':
+            import pyarrow.parquet as pq
+
+            writer = pq.ParquetWriter(output, _dictionary_metadata(first.schema, dictionary), compression=compression or 'snappy')
+        else:
+            options = pa.ipc.IpcWriteOptions(compression=compression)
+            writer = pa.ipc.new_file(output, _dictionary_metadata(first.schema, dictionary), options=options)
+
+        for batch in itertools.chain([first], batches):
+            writer.write_batch(batch)
+            rows_written += batch.num_rows
+        writer.close()
+        if file_format == 'csv' and compression:
+            stream.close()
+    finally:
+        if not output.closed:
+            output.close()
+    return rows_written
+
+def _iter_csv_batches(path, compression, chunk_size):
+    # Streams CSV through pyarrow, the same library export_data writes it with, so gzip and
+    # zstd need nothing else installed. pyarrow cuts batches by bytes; they are re-cut here
+    # into chunk_size rows
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+
+    pending, pending_rows = [], 0
+    with pa.input_stream(str(path), compression=compression) as stream:
+        for batch in pa_csv.open_csv(stream):
+            pending.append(batch)
+            pending_rows += batch.num_rows
+            while pending_rows >= chunk_size:
+                table = pa.Table.from_batches(pending)
+                yield table.slice(0, chunk_size)
+                rest = table.slice(chunk_size)
+                pending, pending_rows = rest.to_batches(), rest.num_rows
+    if pending_rows:
+        yield pa.Table.from_batches(pending)
+
+def iter_file_chunks(path, chunk_size=100_000):
+    """
+    Read a CSV (optionally gzip/zstd compressed), Parquet or Feather/Arrow file chunk by
+    chunk as DataFrames.
+    """
+    file_format, compression = infer_export_format(path)
+    if file_format == 'csv':
+        for table in _iter_csv_batches(path, compression, chunk_size):
+            yield table.to_pandas()
+    elif file_format == 'parquet':
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        import pyarrow as pa
+        with pa.memory_map(str(path)) as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                yield reader.get_batch(i).to_pandas()
+
+def write_data_dictionary(sink, columns):
+    """
+    Write the data dictionary for columns as a CSV sidecar (path or binary file object).
+    """
+    dictionary = data_dictionary(columns)
+    if isinstance(sink, (str, os.PathLike)):
+        dictionary.to_csv(sink, index=False)
+    else:
+        sink.write(dictionary.to_csv(index=False).encode('utf-8'))
+    return dictionary
+
+def read_data_dictionary(path):
+    """
+    Data dictionary embedded in a Parquet or Feather export, or None if there is none.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if str(path).endswith(('.parquet', '.pq')):
+        metadata = pq.read_schema(path).metadata or {}
+    else:
+        with pa.memory_map(str(path)) as source:
+            metadata = pa.ipc.open_file(source).schema.metadata or {}
+    payload = metadata.get(DATA_DICTIONARY_METADATA_KEY)
+    return None if payload is None else pd.DataFrame(json.loads(payload))
@@ -0,0 +1,75 @@
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+class BackgroundJob:
+    """
+    A unit of work running on a JobRunner thread. The work function receives a report
+    callback it can call with progress fields; the UI reads status, progress, result and
+    error from any thread.
+    """
+    def __init__(self, key, fn):
+        self.key = key
+        self._fn = fn
+        self._lock = threading.Lock()
+        self.status = 'pending'
+        self.progress = {}
+        self.result = None
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+
+    def report(self, **progress):
+        with self._lock:
+            self.progress = {**self.progress, **progress}
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.progress)
+
+    @property
+    def done(self):
+        return self.status in ('finished', 'failed')
+
+    @property
+    def elapsed(self):
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+    def run(self):
+        self.status = 'running'
+        self.started_at = time.time()
+        try:
+            self.result = self._fn(self.report)
+            self.status = 'finished'
+        except Exception:
+            self.error = traceback.format_exc()
+            self.status = 'failed'
+        finally:
+            self.finished_at = time.time()
+
+class JobRunner:
+    """
+    Runs BackgroundJobs on a small thread pool, keeping one job per key so that resubmitting
+    identical work returns the existing (running or finished) job instead of starting over.
+    """
+    def __init__(self, max_workers=1):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            return self._jobs.get(key)
+
+    def submit(self, key, fn):
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and job.status != 'failed':
+                return job
+            job = BackgroundJob(key, fn)
+            self._jobs[key] = job
+        self._executor.submit(job.run)
+        return job
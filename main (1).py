@@ -1,11 +1,37 @@
 import streamlit as st
+import os
 import pandas as pd
+import tempfile
+import time
 from io import BytesIO
-from data_generation import create_healthcare_knowledge_graph, generate_synthetic_data
-from utils import prepare_data_for_training, train_hierarchical_vaegan
-from models import HierarchicalVAEGAN
+from data_generation import get_compiled_knowledge_graph, generate_synthetic_data
+from jobs import JobRunner
+from export import export_data, export_file_name
+from schema import data_dictionary
 import plotly.express as px
-import threading
+
+TRAINING_EPOCHS = 5
+LATENT_DIM = 10
+LEARNING_RATE = 0.001
+# How often the page refreshes while a training job is running
+JOB_POLL_SECONDS = 1.0
+
+# Streamlit re-executes this script on every interaction; resources live in st.cache_resource
+# so that loaded models and running jobs survive reruns
+@st.cache_resource
+def get_model_store():
+    from model_store import ModelStore
+
+    return ModelStore()
+
+@st.cache_resource
+def get_job_runner():
+    return JobRunner(max_workers=1)
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def cached_synthetic_data(num_samples, disease_select, genetic_variants, seed):
+    G = get_compiled_knowledge_graph(disease_select, genetic_variants, seed=seed)
+    return generate_synthetic_data(num_samples, G, engine='vectorized', seed=seed)
 
 def main():
     st.set_page_config(page_title="ISD-GRE Healthcare", layout="wide")
@@ -43,106 +69,153 @@ def main():
         genetic_variants = ['Mutation Y', 'Mutation Z']
         st.sidebar.info("Template 'Neurological Study' selected: Pre-filled disease and genetic variants.")
 
+    seed = st.sidebar.number_input("Random Seed", min_value=0, value=0, step=1)
+
     if st.sidebar.button("Generate Synthetic Data"):
         if not disease_select or not genetic_variants:
             st.error("Please select at least one disease and one genetic variant.")
         else:
-            with st.spinner('Generating synthetic data...'):
-                G = create_healthcare_knowledge_graph(disease_select, genetic_variants)
-                synthetic_data = generate_synthetic_data(num_samples, G)
-            st.success(f"Generated {len(synthetic_data)} synthetic data samples successfully!")
-
-            # Display the number of samples generated
-            st.write(f"### Generated {len(synthetic_data)} Samples")
-
-            # Display the data
-            if len(synthetic_data) <= 10000:
-                st.write("### Preview of the Synthetic Data")
-                st.dataframe(synthetic_data)
-            else:
-                st.write("### Preview of the Synthetic Data (First 5 Samples)")
-                st.dataframe(synthetic_data.head())
-
-            # Data Visualization
-            st.write("### Data Visualization")
-            fig = px.histogram(synthetic_data, x='Disease', color='Gender', barmode='group')
-            st.plotly_chart(fig, use_container_width=True)
-
-            # Download options
-            st.write("### Download Synthetic Data")
-            file_format = st.selectbox("Select File Format", ['CSV', 'Excel'])
-            include_data_dict = st.checkbox("Include Data Dictionary")
-            if st.button("Download Data"):
-                download_synthetic_data(synthetic_data, file_format, include_data_dict)
-
-            # Model training (Optional)
-            st.write("### Train a Machine Learning Model (Optional)")
-            if st.button("Train Model"):
-                with st.spinner('Training model...'):
-                    train_model(synthetic_data)
-                st.success("Model trained successfully!")
-
-def download_synthetic_data(synthetic_data, file_format, include_data_dict):
-    data_dict = pd.DataFrame({
-        'Column': synthetic_data.columns,
-        'Description': [
-            'Unique patient identifier',
-            'Age of the patient',
-            'Gender of the patient',
-            'Genetic variant present',
-            'Disease risk level',
-            'Disease assigned',
-            'Risk score calculated',
-            'Simulated lab result 1',
-            'Simulated lab result 2',
-        ]
-    })
-
-    if file_format == 'CSV':
-        if include_data_dict:
-            # Combine synthetic data and data dictionary
-            combined_csv = synthetic_data.to_csv(index=False) + "\n\n" + data_dict.to_csv(index=False)
-            csv_data = combined_csv.encode('utf-8')
-        else:
-            csv_data = synthetic_data.to_csv(index=False).encode('utf-8')
-
-        st.download_button(
-            label="Download Data as CSV",
-            data=csv_data,
-            file_name="synthetic_healthcare_data.csv",
-            mime="text/csv"
+            # The parameters, not the frame, are kept in the session; the frame itself comes
+            # from the generation cache on every rerun
+            st.session_state['generation_params'] = (int(num_samples), tuple(disease_select), tuple(genetic_variants), int(seed))
+
+    if 'generation_params' in st.session_state:
+        show_synthetic_data(st.session_state['generation_params'])
+
+def show_synthetic_data(generation_params):
+    with st.spinner('Generating synthetic data...'):
+        synthetic_data = cached_synthetic_data(*generation_params)
+    st.success(f"Generated {len(synthetic_data)} synthetic data samples successfully!")
+
+    # Display the number of samples generated
+    st.write(f"### Generated {len(synthetic_data)} Samples")
+
+    # Display the data
+    if len(synthetic_data) <= 10000:
+        st.write("### Preview of the Synthetic Data")
+        st.dataframe(synthetic_data)
+    else:
+        st.write("### Preview of the Synthetic Data (First 5 Samples)")
+        st.dataframe(synthetic_data.head())
+
+    # Data Visualization
+    st.write("### Data Visualization")
+    fig = px.histogram(synthetic_data, x='Disease', color='Gender', barmode='group')
+    st.plotly_chart(fig, use_container_width=True)
+
+    # Download options
+    st.write("### Download Synthetic Data")
+    file_format = st.selectbox("Select File Format", list(DOWNLOAD_FORMATS))
+    include_data_dict = st.checkbox("Include Data Dictionary")
+    download_synthetic_data(synthetic_data, file_format, include_data_dict)
+
+    # Model training (Optional), run as a background job so the page stays responsive
+    st.write("### Train a Machine Learning Model (Optional)")
+    job_runner = get_job_runner()
+    job = job_runner.get(generation_params)
+    if st.button("Train Model", disabled=job is not None and not job.done):
+        job = job_runner.submit(
+            generation_params,
+            lambda report: train_model(synthetic_data, on_epoch_end=lambda epoch, losses: report(epoch=epoch + 1, **losses)),
         )
-
-    elif file_format == 'Excel':
+    if job is not None:
+        show_training_job(job)
+
+def show_training_job(job):
+    progress = job.snapshot()
+    if job.status in ('pending', 'running'):
+        epoch = progress.get('epoch', 0)
+        st.progress(epoch / TRAINING_EPOCHS, text=f"Training model... epoch {epoch}/{TRAINING_EPOCHS} ({job.elapsed:.0f}s)")
+        if 'total_loss' in progress:
+            st.write(f"Latest loss: {progress['total_loss']:.4f}")
+        # Poll until the job finishes; any widget interaction interrupts the wait
+        time.sleep(JOB_POLL_SECONDS)
+        st.rerun()
+    elif job.status == 'failed':
+        st.error("Model training failed.")
+        st.code(job.error)
+    else:
+        _, status = job.result
+        if status == 'cached':
+            st.success("Loaded a previously trained model for this configuration!")
+        else:
+            st.success(f"Model trained successfully in {job.elapsed:.1f}s!")
+
+# Download formats offered in the UI: (export format, compression, MIME type)
+DOWNLOAD_FORMATS = {
+    'CSV': ('csv', None, 'text/csv'),
+    'CSV (gzip)': ('csv', 'gzip', 'application/gzip'),
+    'CSV (zstd)': ('csv', 'zstd', 'application/zstd'),
+    'Parquet': ('parquet', None, 'application/vnd.apache.parquet'),
+    'Feather': ('feather', None, 'application/vnd.apache.arrow.file'),
+    'Excel': ('excel', None, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def export_bytes(synthetic_data, file_format, include_data_dict):
+    export_format, compression, _ = DOWNLOAD_FORMATS[file_format]
+    if export_format == 'excel':
         towrite = BytesIO()
         with pd.ExcelWriter(towrite, engine='xlsxwriter') as writer:
             synthetic_data.to_excel(writer, index=False, sheet_name='Data')
             if include_data_dict:
-                data_dict.to_excel(writer, index=False, sheet_name='Data Dictionary')
-            writer.save()
-        towrite.seek(0)
+                data_dictionary(synthetic_data).to_excel(writer, index=False, sheet_name='Data Dictionary')
+        return towrite.getvalue()
+
+    # Written chunk by chunk to a temporary file; only the finished (compressed) file is read back
+    with tempfile.TemporaryFile() as export_file:
+        export_data(synthetic_data, export_file, export_format, compression, include_data_dictionary=include_data_dict)
+        export_file.seek(0)
+        return export_file.read()
+
+def download_synthetic_data(synthetic_data, file_format, include_data_dict):
+    export_format, compression, mime = DOWNLOAD_FORMATS[file_format]
+    file_name = "synthetic_healthcare_data.xlsx" if export_format == 'excel' else export_file_name(
+        "synthetic_healthcare_data", export_format, compression)
+
+    st.download_button(
+        label=f"Download Data as {file_format}",
+        data=export_bytes(synthetic_data, file_format, include_data_dict),
+        file_name=file_name,
+        mime=mime
+    )
+
+    # Parquet/Feather embed the dictionary in their metadata and Excel gets its own sheet;
+    # for CSV it is a separate sidecar file instead of being appended to the data
+    if include_data_dict and export_format == 'csv':
         st.download_button(
-            label="Download Data as Excel",
-            data=towrite,
-            file_name="synthetic_healthcare_data.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            label="Download Data Dictionary",
+            data=data_dictionary(synthetic_data).to_csv(index=False).encode('utf-8'),
+            file_name="synthetic_healthcare_data.dictionary.csv",
+            mime="text/csv"
         )
 
-def train_model(synthetic_data):
+def train_model(synthetic_data, on_epoch_end=None, latent_dim=LATENT_DIM, epochs=TRAINING_EPOCHS, learning_rate=LEARNING_RATE):
+    # TensorFlow is only imported once a model is actually trained
+    from model_store import model_config
+    from utils import build_feature_spec, prepare_data_for_training, train_hierarchical_vaegan
+
     # Prepare data
-    dataset = prepare_data_for_training(synthetic_data)
+    genetic_variants = list(synthetic_data['Genetic_Variant'].astype('category').cat.categories)
+    dataset = prepare_data_for_training(synthetic_data, genetic_variants=genetic_variants)
     input_dims = {
         'genetic': dataset.element_spec['genetic'].shape[-1],
         'clinical': dataset.element_spec['clinical'].shape[-1],
         'environmental': dataset.element_spec['environmental'].shape[-1],
     }
-    latent_dim = 10
-
-    # Initialize and train model
-    model = HierarchicalVAEGAN(input_dims, latent_dim)
-    train_thread = threading.Thread(target=train_hierarchical_vaegan, args=(model, dataset, 5))
-    train_thread.start()
-    train_thread.join()
+    config = model_config(
+        synthetic_data['Disease'].unique(), genetic_variants, input_dims, latent_dim,
+        build_feature_spec(genetic_variants), epochs=epochs, learning_rate=learning_rate, num_samples=len(synthetic_data),
+    )
+
+    # Reuse a stored model for this configuration, otherwise train (warm-starting from the
+    # closest stored checkpoint) and store the result
+    def train(model, dataset):
+        telemetry_path = os.path.join(get_model_store().path(config), 'telemetry.csv')
+        train_hierarchical_vaegan(model, dataset, epochs, compiled=True, on_epoch_end=on_epoch_end,
+                                  telemetry=telemetry_path, learning_rate=learning_rate)
+
+    return get_model_store().get_or_train(config, dataset, train)
 
 if __name__ == "__main__":
     main()
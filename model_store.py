@@ -0,0 +1,123 @@
+import hashlib
+import json
+import os
+import tensorflow as tf
+from models import HierarchicalVAEGAN
+from utils import build_model_weights
+
+DEFAULT_STORE_DIR = os.environ.get('SYNTHETIC_MODEL_STORE', 'model_store')
+# Bumped whenever stored weights stop fitting HierarchicalVAEGAN
+SCHEMA_VERSION = 2
+
+def model_config(diseases, genetic_variants, input_dims, latent_dim, feature_spec, **hyperparameters):
+    """
+    Describe a trained model by everything that determines its weights: the data selection,
+    the record schema/encoding and the architecture and training hyperparameters.
+    """
+    return {
+        'schema_version': SCHEMA_VERSION,
+        'diseases': sorted(diseases),
+        'genetic_variants': sorted(genetic_variants),
+        'input_dims': {name: int(dim) for name, dim in input_dims.items()},
+        'latent_dim': int(latent_dim),
+        'feature_spec': json.loads(json.dumps(feature_spec)),
+        'hyperparameters': hyperparameters,
+    }
+
+def config_key(config):
+    payload = json.dumps(config, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+def build_model(config):
+    model = HierarchicalVAEGAN(config['input_dims'], config['latent_dim'], feature_spec=config['feature_spec'])
+    # Subclassed models only create their weights on the first call
+    return build_model_weights(model, {name: tf.TensorSpec((None, dim), tf.float32)
+                                       for name, dim in config['input_dims'].items()})
+
+class ModelStore:
+    """
+    On-disk model cache keyed by config_key(config). Each entry holds config.json, a weights
+    checkpoint and an exported SavedModel of the decoder (latent vector -> features) for
+    serving without this code base. Loaded models are kept in memory for the process.
+    """
+    def __init__(self, root=DEFAULT_STORE_DIR):
+        self.root = root
+        self._loaded = {}
+
+    def path(self, config):
+        return os.path.join(self.root, config_key(config))
+
+    def contains(self, config):
+        return os.path.exists(os.path.join(self.path(config), 'model.weights.h5'))
+
+    def save(self, model, config):
+        path = self.path(config)
+        os.makedirs(path, exist_ok=True)
+        model.save_weights(os.path.join(path, 'model.weights.h5'))
+        model.decoder.export(os.path.join(path, 'decoder'), verbose=False)
+        with open(os.path.join(path, 'config.json'), 'w') as f:
+            json.dump(config, f, indent=2, sort_keys=True)
+        self._loaded[config_key(config)] = model
+        return path
+
+    def load(self, config):
+        key = config_key(config)
+        if key in self._loaded:
+            return self._loaded[key]
+        if not self.contains(config):
+            return None
+        model = build_model(config)
+        model.load_weights(os.path.join(self.path(config), 'model.weights.h5'))
+        self._loaded[key] = model
+        return model
+
+    def configs(self):
+        if not os.path.isdir(self.root):
+            return []
+        configs = []
+        for entry in sorted(os.listdir(self.root)):
+            config_path = os.path.join(self.root, entry, 'config.json')
+            if os.path.exists(config_path):
+                with open(config_path) as f:
+                    configs.append(json.load(f))
+        return configs
+
+    def nearest(self, config):
+        """
+        Closest stored config whose weights fit this config's architecture, ranked by the
+        overlap of diseases and variants and then by matching hyperparameters.
+        """
+        def similarity(candidate):
+            selected = set(config['diseases']) | set(config['genetic_variants'])
+            stored = set(candidate['diseases']) | set(candidate['genetic_variants'])
+            overlap = len(selected & stored) / max(len(selected | stored), 1)
+            shared = sum(candidate['hyperparameters'].get(name) == value for name, value in config['hyperparameters'].items())
+            return overlap, shared
+
+        candidates = [
+            candidate for candidate in self.configs()
+            if candidate['input_dims'] == config['input_dims'] and candidate['latent_dim'] == config['latent_dim']
+            and candidate.get('schema_version') == config.get('schema_version')
+        ]
+        return max(candidates, key=similarity, default=None)
+
+    def get_or_train(self, config, dataset, train_fn, warm_start=True):
+        """
+        Return (model, status): the stored model for config if there is one ('cached'),
+        otherwise a model trained with train_fn(model, dataset), starting from the
+        nearest stored checkpoint when warm_start is set ('warm_start' or 'trained').
+        """
+        model = self.load(config)
+        if model is not None:
+            return model, 'cached'
+
+        model = build_model(config)
+        status = 'trained'
+        if warm_start:
+            nearest = self.nearest(config)
+            if nearest is not None:
+                model.load_weights(os.path.join(self.path(nearest), 'model.weights.h5'))
+                status = 'warm_start'
+        train_fn(model, dataset)
+        self.save(model, config)
+        return model, status
@@ -1,9 +1,14 @@
+import pandas as pd
 import tensorflow as tf
 from tensorflow.keras import layers, Model
+from utils import decode_features
 
 class HierarchicalVAEGAN(Model):
-    def __init__(self, input_dims, latent_dim):
+    def __init__(self, input_dims, latent_dim, feature_spec=None):
         super(HierarchicalVAEGAN, self).__init__()
+        self.latent_dim = latent_dim
+        # Encoding used by prepare_data_for_training, needed to turn samples back into records
+        self.feature_spec = feature_spec
         # Encoder networks for different data types
         self.genetic_encoder = tf.keras.Sequential([
             layers.InputLayer(input_shape=(input_dims['genetic'],)),
@@ -17,11 +22,15 @@ class HierarchicalVAEGAN(Model):
             layers.Dense(64, activation='relu'),
         ])
 
-        self.environmental_encoder = tf.keras.Sequential([
-            layers.InputLayer(input_shape=(input_dims['environmental'],)),
-            layers.Dense(128, activation='relu'),
-            layers.Dense(64, activation='relu'),
-        ])
+        # There are no environmental columns yet; a zero-width Dense branch adds nothing and
+        # aborts the process under oneDNN inside tf.function, so it is only built when needed
+        self.environmental_encoder = None
+        if input_dims.get('environmental', 0) > 0:
+            self.environmental_encoder = tf.keras.Sequential([
+                layers.InputLayer(input_shape=(input_dims['environmental'],)),
+                layers.Dense(128, activation='relu'),
+                layers.Dense(64, activation='relu'),
+            ])
 
         # Latent space
         self.latent_mu = layers.Dense(latent_dim)
@@ -45,9 +54,11 @@ class HierarchicalVAEGAN(Model):
     def encode(self, x):
         z_genetic = self.genetic_encoder(x['genetic'])
         z_clinical = self.clinical_encoder(x['clinical'])
-        z_environmental = self.environmental_encoder(x['environmental'])
+        encoded = [z_genetic, z_clinical]
+        if self.environmental_encoder is not None:
+            encoded.append(self.environmental_encoder(x['environmental']))
 
-        z = tf.concat([z_genetic, z_clinical, z_environmental], axis=1)
+        z = tf.concat(encoded, axis=1)
         mu = self.latent_mu(z)
         logvar = self.latent_logvar(z)
         return mu, logvar
@@ -68,3 +79,32 @@ class HierarchicalVAEGAN(Model):
         reconstructed_x = self.decode(z)
         validity = self.discriminate(reconstructed_x)
         return reconstructed_x, validity, mu, logvar
+
+    @tf.function(reduce_retracing=True)
+    def _decode_batch(self, z):
+        return self.decode(z)
+
+    def iter_samples(self, n, batch_size=65536, feature_spec=None, seed=None):
+        """
+        Draw n new records from the prior N(0, I), decoding batch_size latent vectors per
+        graph call, and yield each batch as a decoded DataFrame with continuous Patient_IDs.
+        """
+        feature_spec = self.feature_spec if feature_spec is None else feature_spec
+        if feature_spec is None:
+            raise ValueError("A feature_spec (see utils.build_feature_spec) is required to decode samples")
+        rng = tf.random.Generator.from_non_deterministic_state() if seed is None else tf.random.Generator.from_seed(seed)
+
+        for start in range(0, n, batch_size):
+            rows = min(batch_size, n - start)
+            z = rng.normal(shape=(rows, self.latent_dim))
+            yield decode_features(self._decode_batch(z).numpy(), feature_spec, start_id=start + 1)
+
+    def sample(self, n, batch_size=65536, feature_spec=None, seed=None, stream=False):
+        """
+        Generate n synthetic records from the trained decoder. With stream=True the batches
+        are returned as a generator instead of being concatenated into one DataFrame.
+        """
+        batches = self.iter_samples(n, batch_size, feature_spec, seed)
+        if stream:
+            return batches
+        return pd.concat(list(batches), ignore_index=True)
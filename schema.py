@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+
+# Fixed vocabulary of the Gender column; code 1 is 'Female'
+GENDERS = ('Male', 'Female')
+
+# Columns of a generated patient record, in generation order, with their compact storage
+# dtype. Categorical columns store int8 codes into a fixed vocabulary: Gender's is GENDERS,
+# the others come from the knowledge graph and the semantic rule table (see vocabularies).
+COLUMNS = {
+    'Patient_ID': {'type': 'integer', 'dtype': 'uint32', 'description': 'Unique patient identifier'},
+    'Age': {'type': 'integer', 'dtype': 'uint8', 'description': 'Age of the patient in years (0-99)'},
+    'Gender': {'type': 'categorical', 'dtype': 'category', 'description': 'Gender of the patient'},
+    'Genetic_Variant': {'type': 'categorical', 'dtype': 'category', 'description': 'Genetic variant present'},
+    'Disease_Risk': {'type': 'categorical', 'dtype': 'category', 'description': 'Disease risk level derived from the semantic rules'},
+    'Disease': {'type': 'categorical', 'dtype': 'category', 'description': 'Disease assigned from the knowledge graph'},
+    'Risk_Score': {'type': 'float', 'dtype': 'float32', 'description': 'Risk score calculated (0-1)'},
+    'Lab_Result_1': {'type': 'float', 'dtype': 'float32', 'description': 'Simulated lab result 1'},
+    'Lab_Result_2': {'type': 'float', 'dtype': 'float32', 'description': 'Simulated lab result 2'},
+}
+
+def vocabularies(graph, rule_table):
+    """
+    Category order of every categorical column for data generated from a compiled
+    knowledge graph and a compiled semantic rule table.
+    """
+    return {
+        'Gender': list(GENDERS),
+        'Genetic_Variant': list(graph.genetic_variants),
+        'Disease_Risk': list(rule_table.fact_values['Disease_Risk']),
+        'Disease': list(graph.diseases),
+    }
+
+def categorical(codes, categories):
+    # Categorical over a fixed vocabulary from codes, without copying them
+    dtype = pd.CategoricalDtype(categories)
+    codes = np.asarray(codes)
+    return pd.Categorical.from_codes(codes.astype(np.int8 if len(dtype.categories) < 128 else np.int32, copy=False), dtype=dtype)
+
+def category_codes(values, categories):
+    """
+    int codes of values in the vocabulary categories, -1 where a value is not in it. A
+    categorical column already using that vocabulary hands over its codes without copying.
+    """
+    categories = pd.Index(categories)
+    dtype = getattr(values, 'dtype', None)
+    if isinstance(dtype, pd.CategoricalDtype) and dtype.categories.equals(categories):
+        return np.asarray(values.cat.codes if isinstance(values, pd.Series) else values.codes)
+    return categories.get_indexer(np.asarray(values, dtype=object))
+
+def to_compact(data, vocabularies=None):
+    """
+    Cast a frame's known columns to their compact dtypes. Categorical columns use the given
+    vocabularies, or the sorted values present when a column has no vocabulary.
+    """
+    vocabularies = vocabularies or {}
+    columns = {}
+    for column in data.columns:
+        spec = COLUMNS.get(column)
+        if spec is None:
+            columns[column] = data[column]
+        elif spec['dtype'] == 'category':
+            categories = vocabularies.get(column, GENDERS if column == 'Gender' else None)
+            if categories is None:
+                columns[column] = data[column].astype('category')
+            else:
+                columns[column] = pd.Series(categorical(category_codes(data[column], categories), categories), index=data.index)
+        else:
+            columns[column] = data[column].astype(spec['dtype'])
+    return pd.DataFrame(columns, index=data.index)
+
+def data_dictionary(data):
+    """
+    Data dictionary for a frame (or a list of column names): one row per column with its
+    type, storage dtype and description from COLUMNS. Columns outside the schema get their
+    pandas dtype.
+    """
+    columns = list(data.columns) if isinstance(data, pd.DataFrame) else list(data)
+    rows = []
+    for column in columns:
+        spec = COLUMNS.get(column)
+        if spec is None:
+            dtype = str(data[column].dtype) if isinstance(data, pd.DataFrame) else ''
+            spec = {'type': dtype, 'dtype': dtype, 'description': ''}
+        rows.append({'Column': column, 'Type': spec['type'], 'Dtype': spec['dtype'], 'Description': spec['description']})
+    return pd.DataFrame(rows, columns=['Column', 'Type', 'Dtype', 'Description'])
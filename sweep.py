@@ -0,0 +1,205 @@
+import itertools
+import math
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+
+# Hyperparameters every trial has; a sweep overrides any of them
+DEFAULT_PARAMS = {'latent_dim': 10, 'learning_rate': 0.001, 'batch_size': 32}
+FIDELITY_TESTS = ('ks_sketch', 'total_variation')
+
+def expand_grid(grid):
+    """
+    All combinations of a {name: [values]} grid as a list of parameter dicts.
+    """
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+def cpu_slots(workers=None, threads_per_worker=None):
+    """
+    Split the CPUs this process may run on into one disjoint set per worker. By default
+    every worker gets threads_per_worker CPUs (all of them divided evenly when unset).
+    """
+    cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else list(range(os.cpu_count() or 1))
+    if threads_per_worker is None:
+        workers = workers or len(cpus)
+        threads_per_worker = max(len(cpus) // workers, 1)
+    elif workers is None:
+        workers = max(len(cpus) // threads_per_worker, 1)
+    threads_per_worker = min(threads_per_worker, len(cpus))
+    # Slots are disjoint while they fit; asking for more wraps around the CPU list
+    return [[cpus[(i * threads_per_worker + j) % len(cpus)] for j in range(threads_per_worker)] for i in range(workers)]
+
+_worker_data = None
+
+def _init_worker(slots, train_data, validation_data, genetic_variants):
+    # Each worker claims one CPU slot, pins itself to it and sizes TensorFlow's thread pools
+    # to match before TensorFlow runs anything
+    global _worker_data
+    cpus = slots.get()
+    if hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cpus)
+    os.environ['OMP_NUM_THREADS'] = str(len(cpus))
+    import tensorflow as tf
+
+    tf.config.threading.set_intra_op_parallelism_threads(len(cpus))
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+    _worker_data = (train_data, validation_data, genetic_variants)
+
+def validation_reconstruction(model, dataset):
+    """
+    Mean squared reconstruction error of model over an encoded validation dataset.
+    """
+    import tensorflow as tf
+
+    total, rows = 0.0, 0
+    for batch in dataset:
+        real_flat = tf.concat([batch['genetic'], batch['clinical'], batch['environmental']], axis=1)
+        reconstructed, _, _, _ = model(batch)
+        total += float(tf.reduce_sum(tf.reduce_mean(tf.square(real_flat - reconstructed), axis=1)))
+        rows += int(real_flat.shape[0])
+    return total / max(rows, 1)
+
+def sample_fidelity(model, validation_data, sample_size, seed=0):
+    """
+    Mean distance between the validation data and sample_size records sampled from model:
+    the average sketch K-S statistic of numeric columns and total variation distance of
+    categorical columns (0 is a perfect match).
+    """
+    from evaluationmetrics import IDENTIFIER_COLUMNS, perform_statistical_tests
+
+    synthetic_data = model.sample(sample_size, seed=seed)
+    columns = [col for col in synthetic_data.columns if col in validation_data.columns and col not in IDENTIFIER_COLUMNS]
+    tests = perform_statistical_tests(validation_data[columns], synthetic_data[columns], method='sketch')
+    return float(tests.loc[tests['test'].isin(FIDELITY_TESTS), 'statistic'].mean())
+
+def _run_trial(task):
+    from models import HierarchicalVAEGAN
+    from utils import build_feature_spec, build_model_weights, prepare_data_for_training, train_hierarchical_vaegan
+
+    trial_id, params, epochs_done, budget, options = task
+    train_data, validation_data, genetic_variants = _worker_data
+    params = {**DEFAULT_PARAMS, **params}
+    seed = options['seed']
+    dataset = prepare_data_for_training(train_data, batch_size=params['batch_size'], cache='memory',
+                                        genetic_variants=genetic_variants, seed=seed)
+    validation = prepare_data_for_training(validation_data, batch_size=1024, shuffle_buffer=0, cache='memory',
+                                           genetic_variants=genetic_variants)
+    input_dims = {name: dataset.element_spec[name].shape[-1] for name in ('genetic', 'clinical', 'environmental')}
+    model = HierarchicalVAEGAN(input_dims, params['latent_dim'], feature_spec=build_feature_spec(genetic_variants))
+    build_model_weights(model, dataset.element_spec)
+    checkpoint = os.path.join(options['work_dir'], f'trial_{trial_id}.weights.h5')
+    if epochs_done:
+        # Resume from the previous rung; optimizer state starts afresh
+        model.load_weights(checkpoint)
+
+    # Early stopping on validation reconstruction, checked after every epoch
+    state = {'best': math.inf, 'stale': 0, 'epochs': 0}
+
+    def on_epoch_end(epoch, losses):
+        state['epochs'] += 1
+        if options['patience'] is None:
+            return False
+        error = validation_reconstruction(model, validation)
+        if error < state['best'] - options['min_delta']:
+            state['best'], state['stale'] = error, 0
+        else:
+            state['stale'] += 1
+        return state['stale'] >= options['patience']
+
+    started = time.perf_counter()
+    history = train_hierarchical_vaegan(model, dataset, budget - epochs_done, compiled=True,
+                                        on_epoch_end=on_epoch_end, learning_rate=params['learning_rate'],
+                                        discriminator_learning_rate=params.get('discriminator_learning_rate'))
+    seconds = time.perf_counter() - started
+    model.save_weights(checkpoint)
+
+    reconstruction = validation_reconstruction(model, validation)
+    fidelity = sample_fidelity(model, validation_data, options['sample_size'], seed=seed)
+    return {
+        'trial': trial_id,
+        'epochs': epochs_done + state['epochs'],
+        'stopped_early': epochs_done + state['epochs'] < budget,
+        'train_loss': history['total_loss'][-1] if history['total_loss'] else math.nan,
+        'val_reconstruction': reconstruction,
+        'fidelity': fidelity,
+        'score': reconstruction + options['fidelity_weight'] * fidelity,
+        'train_seconds': seconds,
+    }
+
+def halving_budgets(min_epochs, max_epochs, eta):
+    # Epoch budgets of the successive halving rungs: min_epochs * eta**k, capped at max_epochs
+    budgets = [min_epochs]
+    while budgets[-1] < max_epochs:
+        budgets.append(min(budgets[-1] * eta, max_epochs))
+    return budgets
+
+def _run_rungs(executor, configs, results, survivors, budgets, eta, options, verbose):
+    # Successive halving: train the survivors to each rung's budget, keep the best 1/eta
+    for rung, budget in enumerate(budgets):
+        tasks = []
+        for trial_id in survivors:
+            if results[trial_id].get('stopped_early'):
+                # Converged trials keep competing on their last score without more training
+                results[trial_id]['rung'] = rung
+            else:
+                tasks.append((trial_id, configs[trial_id], results[trial_id]['epochs'], budget, options))
+        for result in executor.map(_run_trial, tasks):
+            results[result['trial']].update(result, rung=rung)
+            if verbose:
+                print(f"rung {rung} trial {result['trial']} {configs[result['trial']]}: "
+                      f"score {result['score']:.4f} after {result['epochs']} epochs", flush=True)
+        ranked = sorted(survivors, key=lambda trial_id: results[trial_id].get('score', math.inf))
+        survivors = ranked[:max(1, math.ceil(len(ranked) / eta))]
+
+def run_sweep(configs, train_data, validation_data, genetic_variants=None, workers=None, threads_per_worker=None,
+              min_epochs=1, max_epochs=9, eta=3, patience=None, min_delta=0.0, fidelity_weight=1.0,
+              sample_size=2000, work_dir=None, seed=0, verbose=True):
+    """
+    Train HierarchicalVAEGAN configurations in parallel with successive halving and return
+    the leaderboard, best score first.
+
+    configs is a list of parameter dicts or a {name: [values]} grid (see expand_grid) over
+    latent_dim, learning_rate, discriminator_learning_rate and batch_size. Every config is
+    trained for min_epochs; the best 1/eta by score continue to eta times the budget,
+    and so on up to max_epochs. score is validation reconstruction error plus
+    fidelity_weight times sample_fidelity; patience stops a trial whose validation
+    reconstruction has not improved for that many epochs.
+
+    Trials run in a process pool of workers, each pinned to its own threads_per_worker
+    CPUs with TensorFlow's thread pools sized to match, so trials do not oversubscribe
+    the machine. Checkpoints between rungs go to work_dir (a temporary directory by default).
+    """
+    if isinstance(configs, dict):
+        configs = expand_grid(configs)
+    if genetic_variants is None:
+        genetic_variants = list(train_data['Genetic_Variant'].astype('category').cat.categories)
+    slots = cpu_slots(workers, threads_per_worker)
+    temporary = tempfile.TemporaryDirectory() if work_dir is None else None
+    options = {
+        'seed': seed, 'patience': patience, 'min_delta': min_delta, 'fidelity_weight': fidelity_weight,
+        'sample_size': sample_size, 'work_dir': work_dir or temporary.name,
+    }
+    os.makedirs(options['work_dir'], exist_ok=True)
+
+    results = {trial_id: {'trial': trial_id, **params, 'epochs': 0, 'rung': -1} for trial_id, params in enumerate(configs)}
+    survivors = list(results)
+    # spawn keeps workers free of the parent's state; the queue hands each one a CPU slot
+    context = multiprocessing.get_context('spawn')
+    try:
+        with context.Manager() as manager:
+            slot_queue = manager.Queue()
+            for slot in slots:
+                slot_queue.put(slot)
+            with ProcessPoolExecutor(max_workers=len(slots), mp_context=context, initializer=_init_worker,
+                                     initargs=(slot_queue, train_data, validation_data, genetic_variants)) as executor:
+                _run_rungs(executor, configs, results, survivors, halving_budgets(min_epochs, max_epochs, eta), eta, options, verbose)
+    finally:
+        if temporary is not None:
+            temporary.cleanup()
+
+    leaderboard = pd.DataFrame(list(results.values()))
+    return leaderboard.sort_values(['rung', 'score'], ascending=[False, True]).reset_index(drop=True)
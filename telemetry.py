@@ -0,0 +1,108 @@
+import csv
+import os
+import sys
+import time
+import uuid
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+def peak_rss_mb():
+    """
+    Peak resident set size of this process in MiB, or None where getrusage is unavailable.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KiB elsewhere
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+
+class TrainingTelemetry:
+    """
+    Append-only CSV log of training steps. Each row holds the run id, epoch, global step,
+    the losses of that step, its wall time, throughput and the process's peak memory.
+    Rows are buffered and appended every flush_every steps (and on close), so the log can
+    be read while training runs and several runs can share one file.
+    """
+    def __init__(self, path, run_id=None, flush_every=50):
+        self.path = str(path)
+        self.run_id = run_id or time.strftime('%Y%m%d-%H%M%S-') + uuid.uuid4().hex[:6]
+        self.flush_every = flush_every
+        self._rows = []
+        self._fields = None
+
+    def record(self, epoch, step, losses, seconds, samples, steps=1):
+        self._rows.append({
+            'run_id': self.run_id,
+            'epoch': epoch,
+            'step': step,
+            'steps': steps,
+            **{name: float(value) for name, value in losses.items()},
+            'step_seconds': seconds / max(steps, 1),
+            'samples_per_second': samples / seconds if seconds > 0 else float('nan'),
+            'peak_rss_mb': peak_rss_mb(),
+            'timestamp': time.time(),
+        })
+        if len(self._rows) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if not self._rows:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        new_file = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        if self._fields is None:
+            if new_file:
+                self._fields = list(self._rows[0])
+            else:
+                with open(self.path, newline='') as f:
+                    self._fields = next(csv.reader(f))
+        with open(self.path, 'a', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=self._fields, extrasaction='ignore')
+            if new_file:
+                writer.writeheader()
+            writer.writerows(self._rows)
+        self._rows = []
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def load_telemetry(paths):
+    """
+    Read one or more telemetry logs into a single frame with one row per logged step.
+    """
+    if isinstance(paths, (str, os.PathLike)):
+        paths = [paths]
+    frames = [pd.read_csv(path) for path in paths]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+def summarize_runs(telemetry):
+    """
+    One row per run: steps, epochs, final-epoch mean losses, median step latency,
+    mean throughput and peak memory.
+    """
+    loss_columns = [col for col in telemetry.columns if col.endswith('_loss')]
+    rows = []
+    for run_id, run in telemetry.groupby('run_id', sort=False):
+        last_epoch = run[run['epoch'] == run['epoch'].max()]
+        rows.append({
+            'run_id': run_id,
+            'steps': int(run['steps'].sum()),
+            'epochs': int(run['epoch'].max()) + 1,
+            **{name: last_epoch[name].mean() for name in loss_columns},
+            'median_step_seconds': run['step_seconds'].median(),
+            'samples_per_second': run['samples_per_second'].mean(),
+            'peak_rss_mb': run['peak_rss_mb'].max(),
+        })
+    return pd.DataFrame(rows).set_index('run_id') if rows else pd.DataFrame()
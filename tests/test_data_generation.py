@@ -0,0 +1,133 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.stats import ks_2samp
+from data_generation import (SEMANTIC_RULES, compile_semantic_rules, create_healthcare_knowledge_graph,
+                             generate_conditional_data, generate_synthetic_data, generate_synthetic_data_parallel,
+                             get_compiled_knowledge_graph, iter_synthetic_data, write_synthetic_data)
+
+DISEASES = ("Cystic Fibrosis", "Hemophilia", "Huntington's Disease")
+VARIANTS = ("Mutation X", "Mutation Y", "Mutation Z")
+
+RULES = [
+    {'priority': 1, 'when': {'Age': (60, None), 'Gender': 'Female'}, 'then': {'Disease_Risk': 'Very High Risk'}},
+    {'priority': 2, 'when': {'Genetic_Variant': ['Mutation Y', 'Mutation Z'], 'Disease': 'Hemophilia'},
+     'then': {'Disease_Risk': 'Medium Risk'}},
+    {'priority': 3, 'when': {'Age': (None, 18)}, 'then': {'Disease_Risk': 'Paediatric'}},
+    {'priority': 4, 'when': {'Genetic_Variant': 'Mutation X'}, 'then': {'Disease_Risk': 'High Risk'}},
+    {'priority': 5, 'when': {'Smoker': True}, 'then': {'Disease_Risk': 'High Risk'}},
+]
+
+@pytest.fixture(scope='module')
+def graph():
+    return get_compiled_knowledge_graph(DISEASES, VARIANTS, seed=3)
+
+def test_chunks_are_reproducible_and_continuous(graph, tmp_path):
+    chunks = list(iter_synthetic_data(2500, graph, chunk_size=400, seed=7))
+    assert [len(chunk) for chunk in chunks] == [400] * 6 + [100]
+    data = pd.concat(chunks, ignore_index=True)
+    np.testing.assert_array_equal(data['Patient_ID'], np.arange(1, 2501))
+    pd.testing.assert_frame_equal(pd.concat(iter_synthetic_data(2500, graph, chunk_size=400, seed=7), ignore_index=True), data)
+
+    arrow = pd.concat([batch.to_pandas() for batch in iter_synthetic_data(2500, graph, 400, seed=7, output='arrow')],
+                      ignore_index=True)
+    pd.testing.assert_frame_equal(arrow, data)
+
+    path = tmp_path / 'synthetic.parquet'
+    assert write_synthetic_data(str(path), 2500, graph, chunk_size=400, seed=7) == 2500
+    pd.testing.assert_frame_equal(pd.read_parquet(path), data)
+
+def test_parallel_output_does_not_depend_on_workers(graph):
+    frames = [generate_synthetic_data_parallel(2500, graph, seed=7, workers=workers, shard_size=400)
+              for workers in (1, 2, 3)]
+    hashes = [pd.util.hash_pandas_object(frame, index=True).to_numpy() for frame in frames]
+    for frame, frame_hash in zip(frames[1:], hashes[1:]):
+        pd.testing.assert_frame_equal(frame, frames[0])
+        np.testing.assert_array_equal(frame_hash, hashes[0])
+
+def test_shards_match_chunks(graph):
+    shards = generate_synthetic_data_parallel(2500, graph, seed=7, workers=2, shard_size=400)
+    chunks = pd.concat(iter_synthetic_data(2500, graph, chunk_size=400, seed=7), ignore_index=True)
+    pd.testing.assert_frame_equal(shards, chunks)
+
+def test_engines_accept_networkx_and_compiled_graphs():
+    G = create_healthcare_knowledge_graph(DISEASES, VARIANTS, seed=3)
+    compiled = get_compiled_knowledge_graph(DISEASES, VARIANTS, seed=3)
+    for engine in ('loop', 'vectorized', 'parallel'):
+        pd.testing.assert_frame_equal(generate_synthetic_data(300, G, engine=engine, seed=5),
+                                      generate_synthetic_data(300, compiled, engine=engine, seed=5))
+
+def _random_patients(rng, num_rows):
+    return pd.DataFrame({
+        'Age': rng.integers(0, 100, num_rows),
+        'Gender': rng.choice(['Male', 'Female'], num_rows),
+        'Genetic_Variant': rng.choice(list(VARIANTS) + ['Mutation Q'], num_rows),
+        'Disease': rng.choice(list(DISEASES), num_rows),
+    })
+
+@pytest.mark.parametrize('rules', [None, RULES], ids=['default', 'custom'])
+def test_rule_table_matches_apply_one(rules):
+    table = compile_semantic_rules(rules)
+    patients = _random_patients(np.random.default_rng(0), 2000)
+    expected = [table.apply_one(patient)['Disease_Risk'] for patient in patients.to_dict('records')]
+
+    assert list(table.apply(patients)['Disease_Risk']) == expected
+    categorical = {column: pd.Categorical(values) for column, values in patients.items()}
+    assert list(table.apply(categorical)['Disease_Risk']) == expected
+
+def test_default_rules_are_the_declared_table():
+    assert compile_semantic_rules().rules == sorted(SEMANTIC_RULES, key=lambda rule: rule['priority'])
+
+CONSTRAINTS = [
+    {'Disease': "Huntington's Disease", 'Age': (60, None)},
+    {'Disease_Risk': 'Medium Risk'},
+    {'Disease_Risk': ['Very High Risk', 'Paediatric'], 'Gender': 'Female'},
+    {'Genetic_Variant': ['Mutation Y', 'Mutation Z'], 'Risk_Score': (0.2, 0.5), 'Lab_Result_1': (None, 90)},
+]
+
+@pytest.fixture(scope='module')
+def reference(graph):
+    return generate_synthetic_data(400_000, graph, engine='vectorized', seed=11, rules=RULES)
+
+def _filter(data, constraints):
+    mask = np.ones(len(data), dtype=bool)
+    for column, condition in constraints.items():
+        values = data[column]
+        if isinstance(condition, tuple):
+            low, high = condition
+            if low is not None:
+                mask &= values.to_numpy() >= low
+            if high is not None:
+                mask &= values.to_numpy() < high
+        else:
+            mask &= values.isin(condition if isinstance(condition, list) else [condition]).to_numpy()
+    return data[mask]
+
+@pytest.mark.parametrize('constraints', CONSTRAINTS)
+def test_conditional_matches_generate_and_filter(graph, reference, constraints):
+    expected = _filter(reference, constraints)
+    sampled = generate_conditional_data(50_000, graph, constraints, seed=12, rules=RULES)
+
+    assert len(sampled) == 50_000
+    assert len(_filter(sampled, constraints)) == len(sampled)
+    for column in ('Gender', 'Genetic_Variant', 'Disease', 'Disease_Risk'):
+        expected_freq = expected[column].astype(str).value_counts(normalize=True)
+        sampled_freq = sampled[column].astype(str).value_counts(normalize=True)
+        total_variation = 0.5 * expected_freq.subtract(sampled_freq, fill_value=0).abs().sum()
+        assert total_variation < 0.03, column
+    for column in ('Age', 'Risk_Score', 'Lab_Result_1', 'Lab_Result_2'):
+        assert ks_2samp(expected[column], sampled[column]).statistic < 0.03, column
+
+def test_conditional_categorical_tuples_are_value_sets(graph):
+    # As in rule conditions, a tuple on a categorical column lists allowed values
+    as_tuple = generate_conditional_data(500, graph, {'Disease': ('Hemophilia', 'Cystic Fibrosis')}, seed=4)
+    as_list = generate_conditional_data(500, graph, {'Disease': ['Hemophilia', 'Cystic Fibrosis']}, seed=4)
+    pd.testing.assert_frame_equal(as_tuple, as_list)
+
+def test_conditional_rejects_impossible_cohorts(graph):
+    with pytest.raises(ValueError):
+        generate_conditional_data(10, graph, {'Disease_Risk': 'Very High Risk', 'Gender': 'Male'}, rules=RULES)
+    with pytest.raises(ValueError):
+        generate_conditional_data(10, graph, {'Age': (120, None)})
+    with pytest.raises(ValueError):
+        generate_conditional_data(10, graph, {'Blood_Type': 'O'})
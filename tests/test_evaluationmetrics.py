@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.stats import ks_2samp
+from evaluationmetrics import QuantileSketch, perform_statistical_tests, sketch_ks_2samp
+
+def _sketch(values, capacity, parts=1):
+    # Build from several merged partial sketches, as the chunked and parallel paths do
+    sketches = [QuantileSketch(capacity).update(part) for part in np.array_split(values, parts)]
+    for sketch in sketches[1:]:
+        sketches[0].merge(sketch)
+    return sketches[0]
+
+@pytest.mark.parametrize('capacity,parts', [(64, 1), (256, 4), (1024, 7)])
+def test_sketch_cdf_within_error_bound(capacity, parts):
+    values = np.random.default_rng(capacity).lognormal(size=50_000)
+    sketch = _sketch(values, capacity, parts)
+    points = np.quantile(values, np.linspace(0, 1, 201))
+    exact = np.searchsorted(np.sort(values), points, side='right') / len(values)
+    assert sketch.error_bound() > 0
+    assert np.max(np.abs(sketch.cdf(points) - exact)) <= sketch.error_bound() + 1e-12
+
+@pytest.mark.parametrize('shift', [0.0, 0.05, 0.5])
+def test_sketch_ks_within_error_bound(shift):
+    rng = np.random.default_rng(1)
+    real, synthetic = rng.normal(size=40_000), rng.normal(shift, 1.2, size=30_000)
+    statistic, _, error_bound = sketch_ks_2samp(_sketch(real, 128, 3), _sketch(synthetic, 128, 5))
+    assert abs(statistic - ks_2samp(real, synthetic).statistic) <= error_bound + 1e-12
+
+def test_sketch_tests_report_their_bound():
+    rng = np.random.default_rng(2)
+    real = pd.DataFrame({'x': rng.normal(size=20_000), 'c': rng.choice(['a', 'b'], 20_000)})
+    synthetic = pd.DataFrame({'x': rng.normal(0.1, 1, size=20_000), 'c': rng.choice(['a', 'b'], 20_000)})
+    tests = perform_statistical_tests(real, synthetic, method='sketch', sketch_capacity=256).set_index(['attribute', 'test'])
+    row = tests.loc[('x', 'ks_sketch')]
+    assert abs(row['statistic'] - ks_2samp(real['x'], synthetic['x']).statistic) <= row['error_bound'] + 1e-12
@@ -0,0 +1,34 @@
+import itertools
+import numpy as np
+import pandas as pd
+import pytest
+from data_generation import get_compiled_knowledge_graph, generate_synthetic_data_vectorized
+from evaluationmetrics import compute_moments
+from export import CSV_COMPRESSIONS, EXPORT_FORMATS, export_data, export_file_name, iter_file_chunks, read_data_dictionary
+
+FORMATS = [(file_format, compression) for file_format, compression in itertools.product(EXPORT_FORMATS, CSV_COMPRESSIONS)
+           if file_format == 'csv' or compression is None]
+
+@pytest.fixture(scope='module')
+def data():
+    graph = get_compiled_knowledge_graph(("Cystic Fibrosis", "Hemophilia"), ("Mutation X", "Mutation Y"), seed=1)
+    return generate_synthetic_data_vectorized(2500, graph, seed=2)
+
+@pytest.mark.parametrize('file_format,compression', FORMATS)
+def test_export_round_trip(data, tmp_path, file_format, compression):
+    path = tmp_path / export_file_name('synthetic', file_format, compression)
+    assert export_data(data, str(path), file_format, compression=compression, chunk_size=700) == len(data)
+
+    chunks = list(iter_file_chunks(str(path), chunk_size=1000))
+    if file_format == 'csv':
+        assert [len(chunk) for chunk in chunks] == [1000, 1000, 500]
+    restored = pd.concat(chunks, ignore_index=True)
+    if file_format == 'csv':
+        # CSV keeps values, not dtypes
+        pd.testing.assert_frame_equal(restored, data, check_dtype=False, check_categorical=False, rtol=1e-6)
+    else:
+        pd.testing.assert_frame_equal(restored, data)
+        assert list(read_data_dictionary(str(path))['Column']) == list(data.columns)
+
+    moments = compute_moments([str(path)], ['Age', 'Lab_Result_1']).result()
+    np.testing.assert_allclose(moments.loc['Age', 'mean'], data['Age'].mean())
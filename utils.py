@@ -1,43 +1,310 @@
+import os
+import time
 import tensorflow as tf
 import numpy as np
+import pandas as pd
+from export import iter_file_chunks
+from schema import GENDERS, categorical, category_codes, to_compact
+from telemetry import TrainingTelemetry
 
-def prepare_data_for_training(synthetic_data):
-    genetic_columns = ['Genetic_Variant']
-    clinical_columns = ['Age', 'Gender', 'Risk_Score', 'Lab_Result_1', 'Lab_Result_2']
-    environmental_columns = []
+GENETIC_COLUMNS = ['Genetic_Variant']
+CLINICAL_COLUMNS = ['Age', 'Gender', 'Risk_Score', 'Lab_Result_1', 'Lab_Result_2']
+ENVIRONMENTAL_COLUMNS = []
+# Categorical columns, fed to the pipeline as int codes into their vocabularies
+CATEGORICAL_COLUMNS = ('Gender', 'Genetic_Variant')
+# Value ranges mapped onto [0, 1] so every feature fits the decoder's sigmoid output.
+# Lab results cover +-4 standard deviations of the generator's normal distributions.
+FEATURE_RANGES = {
+    'Age': (0.0, 99.0),
+    'Risk_Score': (0.0, 1.0),
+    'Lab_Result_1': (40.0, 160.0),
+    'Lab_Result_2': (10.0, 90.0),
+}
 
-    synthetic_data_encoded = synthetic_data.copy()
-    synthetic_data_encoded['Gender'] = synthetic_data_encoded['Gender'].map({'Male': 0, 'Female': 1})
-    synthetic_data_encoded['Genetic_Variant'] = synthetic_data_encoded['Genetic_Variant'].astype('category').cat.codes
-    synthetic_data_encoded['Disease'] = synthetic_data_encoded['Disease'].astype('category').cat.codes
+def build_feature_spec(genetic_variants, feature_ranges=None):
+    """
+    Everything needed to map records to model features and back: the Genetic_Variant
+    vocabulary (code order) and the value range scaled onto [0, 1] for each numeric column.
+    """
+    return {
+        'genetic_variants': [str(variant) for variant in genetic_variants],
+        'feature_ranges': dict(FEATURE_RANGES if feature_ranges is None else feature_ranges),
+    }
+
+def decode_features(features, feature_spec, start_id=1, rules=None):
+    """
+    Invert the training encoding for a [rows, features] array of decoder outputs and
+    return records with the generator's column names and compact dtypes, including
+    Disease_Risk from the semantic rules.
+    """
+    from data_generation import compile_semantic_rules
+
+    features = np.asarray(features)
+    genetic_variants = feature_spec['genetic_variants']
+    feature_ranges = feature_spec['feature_ranges']
+    layout = GENETIC_COLUMNS + CLINICAL_COLUMNS + ENVIRONMENTAL_COLUMNS
+
+    columns = {}
+    for position, column in enumerate(layout):
+        values = np.clip(features[:, position], 0.0, 1.0)
+        if column == 'Genetic_Variant':
+            codes = np.rint(values * max(len(genetic_variants) - 1, 1)).astype(np.intp)
+            columns[column] = categorical(np.minimum(codes, len(genetic_variants) - 1), genetic_variants)
+        elif column == 'Gender':
+            columns[column] = categorical((values >= 0.5).astype(np.int8), GENDERS)
+        else:
+            low, high = feature_ranges[column]
+            columns[column] = low + values * (high - low)
+    columns['Age'] = np.rint(columns['Age'])
 
-    data = {
-        'genetic': synthetic_data_encoded[genetic_columns].values.astype('float32'),
-        'clinical': synthetic_data_encoded[clinical_columns].values.astype('float32'),
-        'environmental': synthetic_data_encoded[environmental_columns].values.astype('float32') if environmental_columns else np.empty((len(synthetic_data_encoded), 0)).astype('float32'),
+    rule_table = compile_semantic_rules(rules)
+    facts = rule_table.apply_codes(columns)
+    return to_compact(pd.DataFrame({
+        'Patient_ID': np.arange(start_id, start_id + len(features)),
+        'Age': columns['Age'],
+        'Gender': columns['Gender'],
+        'Genetic_Variant': columns['Genetic_Variant'],
+        'Disease_Risk': categorical(facts['Disease_Risk'], rule_table.fact_values['Disease_Risk']),
+        'Risk_Score': columns['Risk_Score'],
+        'Lab_Result_1': columns['Lab_Result_1'],
+        'Lab_Result_2': columns['Lab_Result_2'],
+    }))
+
+def _training_columns(chunk, genetic_variants):
+    # Only the columns the model consumes, as flat numpy arrays. Categorical columns become
+    # codes into their vocabulary; compact categorical chunks hand over their codes as-is.
+    if not isinstance(chunk, pd.DataFrame):
+        chunk = chunk.to_pandas()
+    vocabularies = {'Gender': GENDERS, 'Genetic_Variant': genetic_variants}
+    columns = {}
+    for column in GENETIC_COLUMNS + CLINICAL_COLUMNS + ENVIRONMENTAL_COLUMNS:
+        if column in CATEGORICAL_COLUMNS:
+            columns[column] = category_codes(chunk[column], vocabularies[column]).astype(np.int32, copy=False)
+        else:
+            columns[column] = np.asarray(chunk[column], dtype=np.float32)
+    return columns
+
+def _column_signature():
+    return {
+        column: tf.TensorSpec(shape=(None,), dtype=tf.int32 if column in CATEGORICAL_COLUMNS else tf.float32)
+        for column in GENETIC_COLUMNS + CLINICAL_COLUMNS + ENVIRONMENTAL_COLUMNS
     }
-    dataset = tf.data.Dataset.from_tensor_slices(data)
-    dataset = dataset.shuffle(buffer_size=1024).batch(32)
+
+def _chunk_dataset(make_chunks, genetic_variants):
+    dataset = tf.data.Dataset.from_generator(
+        lambda: (_training_columns(chunk, genetic_variants) for chunk in make_chunks()),
+        output_signature=_column_signature(),
+    )
+    return dataset.unbatch()
+
+def prepare_data_for_training(synthetic_data, batch_size=32, shuffle_buffer=1024, cache=None, prefetch=True,
+                              num_parallel_calls=tf.data.AUTOTUNE, shard=None, genetic_variants=None, seed=None,
+                              feature_ranges=None):
+    """
+    Build the tf.data input pipeline for HierarchicalVAEGAN.
+
+    synthetic_data is a DataFrame, a path or list of paths (CSV/Parquet/Feather), or a chunk
+    stream such as iter_synthetic_data(...) - either an iterable of DataFrame/RecordBatch
+    chunks or a zero-argument callable returning one. A one-shot iterator can only be read
+    once: pass a callable, or cache= so later epochs replay what the first one read, when
+    training for several epochs. Categorical
+    columns are encoded through their vocabulary codes, so compact frames from the
+    generator are used without converting them to strings.
+
+    cache is None (off), 'memory', or a file path prefix; shard is (num_shards, index), applied
+    per file when several files are given. genetic_variants fixes the Genetic_Variant code
+    order; it is inferred from a DataFrame and required for streams and files. Features are
+    scaled onto [0, 1] with build_feature_spec(genetic_variants, feature_ranges), the same
+    spec HierarchicalVAEGAN.sample uses to decode.
+    """
+    if isinstance(synthetic_data, pd.DataFrame):
+        if genetic_variants is None:
+            genetic_variants = list(synthetic_data['Genetic_Variant'].astype('category').cat.categories)
+        dataset = tf.data.Dataset.from_tensor_slices(_training_columns(synthetic_data, genetic_variants))
+    elif genetic_variants is None:
+        raise ValueError("genetic_variants is required when training from a chunk stream or files")
+    elif isinstance(synthetic_data, (str, os.PathLike, list, tuple)):
+        paths = [synthetic_data] if isinstance(synthetic_data, (str, os.PathLike)) else list(synthetic_data)
+        if shard is not None and len(paths) > 1:
+            num_shards, index = shard
+            paths, shard = paths[index::num_shards], None
+        dataset = _chunk_dataset(lambda: (chunk for path in paths for chunk in iter_file_chunks(path)), genetic_variants)
+    else:
+        make_chunks = synthetic_data if callable(synthetic_data) else lambda: synthetic_data
+        dataset = _chunk_dataset(make_chunks, genetic_variants)
+
+    feature_spec = build_feature_spec(genetic_variants, feature_ranges)
+    variant_scale = 1.0 / max(len(genetic_variants) - 1, 1)
+
+    def scaled(columns, column):
+        low, high = feature_spec['feature_ranges'][column]
+        return tf.clip_by_value((columns[column] - low) / (high - low), 0.0, 1.0)
+
+    def encode(columns):
+        # Gender code 1 is 'Female'; variant codes outside the vocabulary are -1 and scale below 0
+        gender = tf.cast(tf.equal(columns['Gender'], 1), tf.float32)
+        clinical = [gender if column == 'Gender' else scaled(columns, column) for column in CLINICAL_COLUMNS]
+        genetic = [tf.cast(columns[column], tf.float32) * variant_scale for column in GENETIC_COLUMNS]
+        environmental = [scaled(columns, column) for column in ENVIRONMENTAL_COLUMNS]
+        num_rows = tf.shape(gender)[0]
+        return {
+            'genetic': tf.stack(genetic, axis=1),
+            'clinical': tf.stack(clinical, axis=1),
+            'environmental': tf.stack(environmental, axis=1) if environmental else tf.zeros((num_rows, 0), tf.float32),
+        }
+
+    if shard is not None:
+        dataset = dataset.shard(*shard)
+    if cache is not None:
+        dataset = dataset.cache('' if cache == 'memory' else cache)
+    if shuffle_buffer:
+        dataset = dataset.shuffle(buffer_size=shuffle_buffer, seed=seed)
+    # Encode whole batches so the lookups and stacking run once per batch, in parallel
+    dataset = dataset.batch(batch_size).map(encode, num_parallel_calls=num_parallel_calls)
+    if prefetch:
+        dataset = dataset.prefetch(tf.data.AUTOTUNE)
     return dataset
 
-def train_hierarchical_vaegan(model, dataset, epochs=5):
-    optimizer = tf.keras.optimizers.Adam(learning_rate=0.001)
+LOSS_NAMES = ('total_loss', 'reconstruction_loss', 'kl_loss', 'generator_loss', 'discriminator_loss')
+
+def build_model_weights(model, element_spec):
+    """
+    Create model's weights with a zero batch shaped by element_spec, a {name: TensorSpec}
+    mapping such as a dataset's element_spec. The dataset itself is never read, since a
+    one-shot chunk stream would lose the records read.
+    """
+    model({name: tf.zeros((1, spec.shape[-1]), spec.dtype) for name, spec in element_spec.items()})
+    return model
+
+def _split_trainable_variables(model):
+    discriminator_ids = {id(v) for v in model.discriminator.trainable_variables}
+    generator_variables = [v for v in model.trainable_variables if id(v) not in discriminator_ids]
+    return generator_variables, list(model.discriminator.trainable_variables)
+
+def make_train_step(model, generator_optimizer, discriminator_optimizer, loss_metrics):
+    """
+    Build one VAE-GAN update. The encoders and decoder minimize reconstruction + KL + the
+    adversarial loss of their reconstructions; the discriminator gets its own update on
+    real (label 1) versus reconstructed (label 0) records. Losses are accumulated into
+    loss_metrics so they stay on-device between steps, and returned as a dict.
+    """
     bce = tf.keras.losses.BinaryCrossentropy(from_logits=False)
     mse = tf.keras.losses.MeanSquaredError()
+    generator_variables, discriminator_variables = _split_trainable_variables(model)
+
+    def train_step(batch_data):
+        real_flat = tf.concat([batch_data['genetic'], batch_data['clinical'], batch_data['environmental']], axis=1)
+        with tf.GradientTape() as generator_tape, tf.GradientTape() as discriminator_tape:
+            reconstructed_x, validity, mu, logvar = model(batch_data)
+            reconstruction_loss = mse(real_flat, reconstructed_x)
+            kl_loss = -0.5 * tf.reduce_mean(1 + logvar - tf.square(mu) - tf.exp(logvar))
+            generator_loss = bce(tf.ones_like(validity), validity)
+            total_loss = reconstruction_loss + kl_loss + generator_loss
+
+            real_validity = model.discriminate(real_flat)
+            fake_validity = model.discriminate(tf.stop_gradient(reconstructed_x))
+            discriminator_loss = (bce(tf.ones_like(real_validity), real_validity)
+                                  + bce(tf.zeros_like(fake_validity), fake_validity))
+
+        generator_gradients = generator_tape.gradient(total_loss, generator_variables)
+        generator_optimizer.apply_gradients(zip(generator_gradients, generator_variables))
+        discriminator_gradients = discriminator_tape.gradient(discriminator_loss, discriminator_variables)
+        discriminator_optimizer.apply_gradients(zip(discriminator_gradients, discriminator_variables))
+
+        losses = (total_loss, reconstruction_loss, kl_loss, generator_loss, discriminator_loss)
+        for name, value in zip(LOSS_NAMES, losses):
+            loss_metrics[name].update_state(value)
+        return dict(zip(LOSS_NAMES, losses))
+
+    return train_step
+
+def make_compiled_train_function(train_step, steps_per_execution=1, jit_compile=False):
+    """
+    Trace train_step once (optionally XLA-compiled) and wrap it in a graph function that
+    runs up to steps_per_execution steps from a dataset iterator per call. Returns the
+    number of steps actually run, which is smaller at the end of the dataset, the number
+    of records they consumed and the mean of each loss over those steps.
+    """
+    compiled_step = tf.function(train_step, jit_compile=jit_compile)
 
+    @tf.function
+    def train_function(iterator):
+        steps = tf.constant(0)
+        samples = tf.constant(0)
+        loss_sums = {name: tf.constant(0.0) for name in LOSS_NAMES}
+        for _ in tf.range(steps_per_execution):
+            batch = iterator.get_next_as_optional()
+            if not batch.has_value():
+                break
+            batch_data = batch.get_value()
+            losses = compiled_step(batch_data)
+            loss_sums = {name: loss_sums[name] + losses[name] for name in LOSS_NAMES}
+            samples += tf.shape(batch_data['genetic'])[0]
+            steps += 1
+        count = tf.cast(tf.maximum(steps, 1), tf.float32)
+        return steps, samples, {name: total / count for name, total in loss_sums.items()}
+
+    return train_function
+
+def train_hierarchical_vaegan(model, dataset, epochs=5, compiled=False, jit_compile=False, steps_per_execution=1,
+                             on_epoch_end=None, telemetry=None, learning_rate=0.001, discriminator_learning_rate=None):
+    """
+    Train for epochs passes over dataset and return the per-epoch mean of each loss.
+    Both networks use Adam; the discriminator's learning rate defaults to learning_rate.
+    on_epoch_end(epoch, losses) runs after every epoch and stops training by returning True.
+    telemetry (a TrainingTelemetry or a log path) records every step - or every
+    execution of steps_per_execution compiled steps - with its losses, latency,
+    throughput and peak memory.
+    """
+    if isinstance(telemetry, (str, os.PathLike)):
+        telemetry = TrainingTelemetry(telemetry)
+    if discriminator_learning_rate is None:
+        discriminator_learning_rate = learning_rate
+    generator_optimizer = tf.keras.optimizers.Adam(learning_rate=learning_rate)
+    discriminator_optimizer = tf.keras.optimizers.Adam(learning_rate=discriminator_learning_rate)
+    loss_metrics = {name: tf.keras.metrics.Mean(name=name) for name in LOSS_NAMES}
+
+    # Build the model and both optimizers up front so tracing never creates variables
+    build_model_weights(model, dataset.element_spec)
+    generator_variables, discriminator_variables = _split_trainable_variables(model)
+    generator_optimizer.build(generator_variables)
+    discriminator_optimizer.build(discriminator_variables)
+
+    train_step = make_train_step(model, generator_optimizer, discriminator_optimizer, loss_metrics)
+    if compiled:
+        train_function = make_compiled_train_function(train_step, steps_per_execution, jit_compile)
+
+    history = {name: [] for name in LOSS_NAMES}
+    step = 0
     for epoch in range(epochs):
-        for batch_data in dataset:
-            with tf.GradientTape() as tape:
-                reconstructed_x, validity, mu, logvar = model(batch_data)
-                real_flat = tf.concat([batch_data['genetic'], batch_data['clinical'], batch_data['environmental']], axis=1)
-                reconstructed_flat = reconstructed_x
-                reconstruction_loss = mse(real_flat, reconstructed_flat)
-                kl_loss = -0.5 * tf.reduce_mean(1 + logvar - tf.square(mu) - tf.exp(logvar))
-                vae_loss = reconstruction_loss + kl_loss
-                valid_labels = tf.ones_like(validity)
-                gan_loss = bce(valid_labels, validity)
-                total_loss = vae_loss + gan_loss
-
-            gradients = tape.gradient(total_loss, model.trainable_variables)
-            optimizer.apply_gradients(zip(gradients, model.trainable_variables))
-        print(f"Epoch {epoch+1}, Loss: {total_loss.numpy()}")
+        for metric in loss_metrics.values():
+            metric.reset_state()
+
+        if compiled:
+            iterator = iter(dataset)
+            steps = steps_per_execution
+            while steps == steps_per_execution:
+                started = time.perf_counter()
+                steps, samples, losses = train_function(iterator)
+                steps = int(steps)
+                step += steps
+                if telemetry is not None and steps:
+                    telemetry.record(epoch, step, losses, time.perf_counter() - started, int(samples), steps)
+        else:
+            for batch_data in dataset:
+                started = time.perf_counter()
+                losses = train_step(batch_data)
+                step += 1
+                if telemetry is not None:
+                    # float() waits for the step to finish, so the latency is the real one
+                    losses = {name: float(value) for name, value in losses.items()}
+                    telemetry.record(epoch, step, losses, time.perf_counter() - started, int(batch_data['genetic'].shape[0]))
+
+        for name, metric in loss_metrics.items():
+            history[name].append(float(metric.result()))
+        print(f"Epoch {epoch+1}, Loss: {history['total_loss'][-1]}")
+        if on_epoch_end is not None and on_epoch_end(epoch, {name: values[-1] for name, values in history.items()}):
+            break
+    if telemetry is not None:
+        telemetry.flush()
+    return history
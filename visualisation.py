@@ -1,71 +1,76 @@
+import argparse
+import os
 import matplotlib.pyplot as plt
-import numpy as np
+from telemetry import load_telemetry, summarize_runs
 
-# Example epoch data for synthetic losses and accuracy values
-epochs = range(1, 21)
+# Panels drawn for every run: (title, y label, telemetry columns)
+LOSS_PANELS = [
+    ('Overall Model Loss', 'Total Loss', ['total_loss']),
+    ('Reconstruction Loss', 'Reconstruction Loss', ['reconstruction_loss']),
+    ('KL Divergence Loss', 'KL Divergence Loss', ['kl_loss']),
+    ('Adversarial Losses', 'Loss', ['generator_loss', 'discriminator_loss']),
+]
+PERFORMANCE_PANELS = [
+    ('Step Latency', 'Seconds per Step', ['step_seconds']),
+    ('Training Throughput', 'Samples per Second', ['samples_per_second']),
+    ('Peak Memory', 'Peak RSS (MiB)', ['peak_rss_mb']),
+]
+LINE_STYLES = ['-', '--', '-.', ':']
 
-# Total Loss data for each model (replace with actual training loss data)
-vae_loss = [0.85, 0.8, 0.75, 0.73, 0.7, 0.68, 0.66, 0.65, 0.63, 0.6, 0.59, 0.58, 0.56, 0.55, 0.53, 0.52, 0.5, 0.49, 0.48, 0.47]
-gan_loss = [0.9, 0.85, 0.83, 0.8, 0.78, 0.76, 0.74, 0.72, 0.71, 0.7, 0.68, 0.67, 0.65, 0.64, 0.62, 0.6, 0.58, 0.56, 0.55, 0.54]
-hierarchical_vae_gan_loss = [0.75, 0.7, 0.67, 0.65, 0.63, 0.61, 0.6, 0.58, 0.57, 0.56, 0.55, 0.53, 0.52, 0.51, 0.5, 0.48, 0.47, 0.46, 0.45, 0.44]
+def _run_label(run_id, labels):
+    return labels.get(run_id, run_id) if labels else run_id
 
-# Reconstruction Loss data
-vae_reconstruction_loss = [0.65, 0.6, 0.57, 0.55, 0.53, 0.51, 0.5, 0.49, 0.47, 0.46, 0.45, 0.44, 0.43, 0.42, 0.41, 0.4, 0.39, 0.38, 0.37, 0.36]
-gan_generator_loss = [0.7, 0.68, 0.66, 0.64, 0.63, 0.61, 0.6, 0.59, 0.57, 0.56, 0.55, 0.54, 0.53, 0.52, 0.51, 0.5, 0.49, 0.48, 0.47, 0.46]
-hierarchical_vae_gan_reconstruction_loss = [0.6, 0.57, 0.55, 0.53, 0.52, 0.5, 0.49, 0.48, 0.47, 0.46, 0.45, 0.44, 0.43, 0.42, 0.41, 0.4, 0.39, 0.38, 0.37, 0.36]
+def plot_run_comparison(telemetry, panels, title, smoothing=20, labels=None, output_path=None):
+    """
+    One subplot per panel with a line per run against the global step, smoothed by a rolling
+    mean over smoothing logged steps. Saves to output_path when given, otherwise shows it.
+    """
+    fig, axes = plt.subplots(len(panels), 1, figsize=(10, 4 * len(panels)), sharex=True, squeeze=False)
+    for ax, (panel_title, ylabel, columns) in zip(axes[:, 0], panels):
+        for i, (run_id, run) in enumerate(telemetry.groupby('run_id', sort=False)):
+            for column in columns:
+                if column not in run or run[column].isna().all():
+                    continue
+                values = run[column].rolling(smoothing, min_periods=1).mean()
+                label = _run_label(run_id, labels) + (f" {column}" if len(columns) > 1 else '')
+                ax.plot(run['step'], values, label=label, linestyle=LINE_STYLES[i % len(LINE_STYLES)])
+        ax.set_title(panel_title)
+        ax.set_ylabel(ylabel)
+        ax.legend()
+        ax.grid(True)
+    axes[-1, 0].set_xlabel('Step')
+    fig.suptitle(title)
+    fig.tight_layout()
+    if output_path is None:
+        plt.show()
+    else:
+        fig.savefig(output_path)
+        plt.close(fig)
 
-# KL Divergence Loss (for VAE models)
-vae_kl_loss = [0.2, 0.18, 0.17, 0.15, 0.14, 0.13, 0.12, 0.11, 0.1, 0.09, 0.085, 0.08, 0.075, 0.07, 0.065, 0.06, 0.058, 0.055, 0.053, 0.05]
-hierarchical_vae_gan_kl_loss = [0.18, 0.16, 0.15, 0.13, 0.12, 0.11, 0.1, 0.095, 0.09, 0.085, 0.08, 0.075, 0.07, 0.065, 0.06, 0.058, 0.055, 0.053, 0.051, 0.05]
+def compare_training_runs(log_paths, run_ids=None, labels=None, smoothing=20, output_dir=None):
+    """
+    Load telemetry logs written by train_hierarchical_vaegan, plot losses and performance
+    of every run (or only run_ids) side by side and return the per-run summary.
+    """
+    telemetry = load_telemetry(log_paths)
+    if run_ids is not None:
+        telemetry = telemetry[telemetry['run_id'].isin(run_ids)]
+    if telemetry.empty:
+        raise ValueError("No telemetry to plot")
 
-# Accuracy data for each model
-vae_accuracy = [0.5, 0.55, 0.57, 0.6, 0.62, 0.63, 0.65, 0.66, 0.67, 0.68, 0.69, 0.7, 0.71, 0.72, 0.73, 0.74, 0.75, 0.76, 0.77, 0.78]
-gan_accuracy = [0.45, 0.5, 0.52, 0.55, 0.57, 0.6, 0.61, 0.63, 0.64, 0.65, 0.66, 0.67, 0.68, 0.69, 0.7, 0.71, 0.72, 0.73, 0.74, 0.75]
-hierarchical_vae_gan_accuracy = [0.52, 0.57, 0.6, 0.63, 0.65, 0.67, 0.69, 0.7, 0.71, 0.72, 0.73, 0.74, 0.75, 0.76, 0.77, 0.78, 0.79, 0.8, 0.81, 0.82]
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+    for name, panels, title in (('losses', LOSS_PANELS, 'Training Loss Comparison'),
+                                ('performance', PERFORMANCE_PANELS, 'Training Performance Comparison')):
+        output_path = None if output_dir is None else os.path.join(output_dir, f"{name}.png")
+        plot_run_comparison(telemetry, panels, title, smoothing=smoothing, labels=labels, output_path=output_path)
+    return summarize_runs(telemetry)
 
-# Plot Overall Model Loss Comparison
-plt.figure(figsize=(10, 6))
-plt.plot(epochs, vae_loss, label='VAE Total Loss', marker='o', linestyle='-')
-plt.plot(epochs, gan_loss, label='GAN Total Loss', marker='s', linestyle='--')
-plt.plot(epochs, hierarchical_vae_gan_loss, label='Hierarchical VAE-GAN Total Loss', marker='^', linestyle='-.')
-plt.xlabel('Epochs')
-plt.ylabel('Overall Model Loss')
-plt.title('Overall Model Loss Comparison for VAE, GAN, and Hierarchical VAE-GAN')
-plt.legend()
-plt.grid(True)
-plt.show()
-
-# Plot Reconstruction Loss Comparison
-plt.figure(figsize=(10, 6))
-plt.plot(epochs, vae_reconstruction_loss, label='VAE Reconstruction Loss', marker='o', linestyle='-')
-plt.plot(epochs, gan_generator_loss, label='GAN Generator Loss', marker='s', linestyle='--')
-plt.plot(epochs, hierarchical_vae_gan_reconstruction_loss, label='Hierarchical VAE-GAN Reconstruction Loss', marker='^', linestyle='-.')
-plt.xlabel('Epochs')
-plt.ylabel('Reconstruction Loss')
-plt.title('Reconstruction Loss Comparison for VAE, GAN, and Hierarchical VAE-GAN')
-plt.legend()
-plt.grid(True)
-plt.show()
-
-# Plot KL Divergence Loss for VAE and Hierarchical VAE-GAN
-plt.figure(figsize=(10, 6))
-plt.plot(epochs, vae_kl_loss, label='VAE KL Divergence Loss', marker='o', linestyle='-')
-plt.plot(epochs, hierarchical_vae_gan_kl_loss, label='Hierarchical VAE-GAN KL Divergence Loss', marker='^', linestyle='-.')
-plt.xlabel('Epochs')
-plt.ylabel('KL Divergence Loss')
-plt.title('KL Divergence Loss Comparison for VAE and Hierarchical VAE-GAN')
-plt.legend()
-plt.grid(True)
-plt.show()
-
-# Plot Accuracy Comparison for VAE, GAN, and Hierarchical VAE-GAN
-plt.figure(figsize=(10, 6))
-plt.plot(epochs, vae_accuracy, label='VAE Accuracy', marker='o', linestyle='-')
-plt.plot(epochs, gan_accuracy, label='GAN Accuracy', marker='s', linestyle='--')
-plt.plot(epochs, hierarchical_vae_gan_accuracy, label='Hierarchical VAE-GAN Accuracy', marker='^', linestyle='-.')
-plt.xlabel('Epochs')
-plt.ylabel('Accuracy')
-plt.title('Accuracy Comparison for VAE, GAN, and Hierarchical VAE-GAN')
-plt.legend()
-plt.grid(True)
-plt.show()
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare training runs from telemetry logs")
+    parser.add_argument('logs', nargs='+', help="telemetry CSV files")
+    parser.add_argument('--runs', nargs='*', help="only plot these run ids")
+    parser.add_argument('--smoothing', type=int, default=20, help="rolling mean window in logged steps")
+    parser.add_argument('--output-dir', help="save the figures here instead of showing them")
+    args = parser.parse_args()
+    print(compare_training_runs(args.logs, run_ids=args.runs, smoothing=args.smoothing, output_dir=args.output_dir))